@@ -1,51 +1,124 @@
 import sys
 import math
 import os
+import numpy as np
 import pygame
 from pygame.locals import *
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")) # headless, mesh_cache, textures, ...: one copy for every lab
+import headless  # before OpenGL: selects the offscreen GL platform for --headless runs
 from OpenGL.GL import *
 from OpenGL.GLU import *
 
+import mesh_cache
+
 WIDTH, HEIGHT = 800, 600
 OFFSET_FIX = 2.0  
 
 class Snowman:
     def __init__(self, filename):
-        self.vertices = []
-        self.normals = []
-        self.faces = []
         self.materials = {}
-        
-        self.load_materials(filename)
-        
+        self.mtl_filename = filename.replace(".obj", ".mtl")
+
         try:
-            for line in open(filename, "r"):
-                if line.startswith('#'): continue
-                values = line.split()
-                if not values: continue
-                
-                if values[0] == 'v':
-                    self.vertices.append(list(map(float, values[1:4])))
-                elif values[0] == 'vn':
-                    self.normals.append(list(map(float, values[1:4])))
-                elif values[0] == 'usemtl':
-                    self.current_material = values[1]
-                elif values[0] == 'f':
-                    face_data = []
-                    for v in values[1:]:
-                        w = v.split('/')
-                        vertex_idx = int(w[0]) - 1
-                        if len(w) >= 3 and len(w[2]) > 0:
-                            normal_idx = int(w[2]) - 1
-                        else:
-                            normal_idx = -1
-                        face_data.append((vertex_idx, normal_idx))
-                    self.faces.append((face_data, getattr(self, 'current_material', None)))
-                    
+            arrays, meta = mesh_cache.load(filename, lambda: self.parse(filename),
+                                           sources=[filename, self.mtl_filename])
         except IOError:
             print(f"ERROR: Could not find {filename}.")
             sys.exit()
 
+        self.materials = meta["materials"]
+        self.vertices = arrays["vertices"]
+        self.normals = arrays["normals"]
+        self.batches = self.build_batches(arrays, meta["range_materials"])
+
+    def build_batches(self, arrays, range_materials):
+        """Group the triangles by usemtl into one flat vertex + normal array per material."""
+        triangles = arrays["triangles"]
+        triangle_normals = arrays["triangle_normals"]
+
+        # faces without a normal get their flat face normal instead
+        corners = self.vertices[triangles]
+        face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        # unit length (GL_NORMALIZE is off), degenerate triangles keep a zero normal
+        lengths = np.linalg.norm(face_normals, axis=1, keepdims=True)
+        face_normals = face_normals / np.where(lengths > 0, lengths, 1.0)
+        face_normals = np.repeat(face_normals, 3, axis=0).reshape(-1, 3, 3)
+
+        by_material = {}
+        for material_name, (start, count) in zip(range_materials, arrays["material_ranges"].tolist()):
+            by_material.setdefault(material_name, []).append(np.arange(start, start + count))
+
+        default_color = [1.0, 1.0, 1.0, 1.0]
+        batches = []
+        for material_name, parts in by_material.items():
+            tri_ids = np.concatenate(parts)
+            normal_ids = triangle_normals[tri_ids]
+            normals = np.where((normal_ids >= 0)[..., None],
+                               self.normals[np.maximum(normal_ids, 0)] if len(self.normals) else 0.0,
+                               face_normals[tri_ids])
+            color = self.materials.get(material_name, default_color) if material_name else default_color
+            batches.append((
+                color,
+                np.ascontiguousarray(corners[tri_ids].reshape(-1, 3), dtype=np.float32),
+                np.ascontiguousarray(normals.reshape(-1, 3), dtype=np.float32),
+            ))
+        return batches
+
+    def parse(self, filename):
+        vertices = []
+        normals = []
+        triangles = []
+        triangle_normals = []
+        range_materials = []
+        ranges = []
+        current_material = None
+
+        self.load_materials(filename)
+
+        for line in open(filename, "r"):
+            if line.startswith('#'): continue
+            values = line.split()
+            if not values: continue
+
+            if values[0] == 'v':
+                vertices.append(list(map(float, values[1:4])))
+            elif values[0] == 'vn':
+                normals.append(list(map(float, values[1:4])))
+            elif values[0] == 'usemtl':
+                current_material = values[1]
+            elif values[0] == 'f':
+                face_data = []
+                for v in values[1:]:
+                    w = v.split('/')
+                    vertex_idx = int(w[0]) - 1
+                    if len(w) >= 3 and len(w[2]) > 0:
+                        normal_idx = int(w[2]) - 1
+                    else:
+                        normal_idx = -1
+                    face_data.append((vertex_idx, normal_idx))
+
+                # one material range per run of faces sharing a usemtl
+                if not ranges or range_materials[-1] != current_material:
+                    range_materials.append(current_material)
+                    ranges.append([len(triangles), 0])
+
+                # fan-triangulate so every face is a GL_TRIANGLES triple
+                for i in range(1, len(face_data) - 1):
+                    corners = (face_data[0], face_data[i], face_data[i + 1])
+                    triangles.append([c[0] for c in corners])
+                    triangle_normals.append([c[1] for c in corners])
+                    ranges[-1][1] += 1
+
+        arrays = {
+            "vertices": np.array(vertices, dtype=np.float32).reshape(-1, 3),
+            "normals": np.array(normals, dtype=np.float32).reshape(-1, 3),
+            "triangles": np.array(triangles, dtype=np.int32).reshape(-1, 3),
+            "triangle_normals": np.array(triangle_normals, dtype=np.int32).reshape(-1, 3),
+            "material_ranges": np.array(ranges, dtype=np.int32).reshape(-1, 2),
+        }
+        meta = {"materials": self.materials, "range_materials": range_materials}
+        return arrays, meta
+
     def load_materials(self, obj_filename):
         mtl_filename = obj_filename.replace(".obj", ".mtl")
         if not os.path.exists(mtl_filename):
@@ -63,23 +136,17 @@ class Snowman:
                     self.materials[current_mtl_name] = color
 
     def render(self):
-        glBegin(GL_TRIANGLES)
-        current_drawn_mat = None
-        default_color = [1.0, 1.0, 1.0, 1.0]
-        
-        for face_data, material_name in self.faces:
-            if material_name != current_drawn_mat:
-                current_drawn_mat = material_name
-                if material_name and material_name in self.materials:
-                    glMaterialfv(GL_FRONT, GL_DIFFUSE, self.materials[material_name])
-                else:
-                    glMaterialfv(GL_FRONT, GL_DIFFUSE, default_color)
-
-            for vertex_idx, normal_idx in face_data:
-                if normal_idx >= 0:
-                    glNormal3fv(self.normals[normal_idx])
-                glVertex3fv(self.vertices[vertex_idx])
-        glEnd()
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+
+        for color, positions, normals in self.batches:
+            glMaterialfv(GL_FRONT, GL_DIFFUSE, color)
+            glVertexPointer(3, GL_FLOAT, 0, positions)
+            glNormalPointer(GL_FLOAT, 0, normals)
+            glDrawArrays(GL_TRIANGLES, 0, len(positions))
+
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
 
 def init_pygame():
     pygame.init()
@@ -109,11 +176,33 @@ def init_opengl():
               0.0, 0.5, 0.0,   
               0.0, 1.0, 0.0)   
 
-def main():
-    init_pygame()
+def init_scene():
     init_opengl()
+    return Snowman("snowman.obj")
+
+def draw_frame(snowman, dance_timer=None):
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    glPushMatrix()
+
+    glRotatef(180, 0, 1, 0) 
+
+    #Dance Animation
+    if dance_timer is not None:
+        jump_height = abs(math.sin(dance_timer)) * 1.5
+        spin_angle = dance_timer * 50.0 
+
+        glTranslatef(0.0, jump_height, 0.0) 
+        glRotatef(spin_angle, 0.0, 1.0, 0.0) 
 
-    snowman = Snowman("snowman.obj") 
+    glTranslatef(0.0, OFFSET_FIX, 0.0)
+    
+    snowman.render()
+
+    glPopMatrix()
+
+def main():
+    init_pygame()
+    snowman = init_scene()
 
     clock = pygame.time.Clock()
 
@@ -132,30 +221,15 @@ def main():
                     is_dancing = True
                     dance_timer = 0.0
 
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        glPushMatrix()
-
-        glRotatef(180, 0, 1, 0) 
-
-        #Dance Animation
         if is_dancing:
             dance_timer += 0.1 
-            jump_height = abs(math.sin(dance_timer)) * 1.5
-            spin_angle = dance_timer * 50.0 
-
-            glTranslatef(0.0, jump_height, 0.0) 
-            glRotatef(spin_angle, 0.0, 1.0, 0.0) 
+            draw_frame(snowman, dance_timer)
 
             if dance_timer > 6.28: 
                 is_dancing = False
                 dance_timer = 0.0
-
-
-        glTranslatef(0.0, OFFSET_FIX, 0.0)
-        
-        snowman.render()
-
-        glPopMatrix()
+        else:
+            draw_frame(snowman)
 
         pygame.display.flip()
         clock.tick(60)
@@ -163,5 +237,23 @@ def main():
     pygame.quit()
     sys.exit()
 
+# headless frames loop the dance: 63 steps of 0.1, like one press of 'D'
+DANCE_FRAMES = 63
+
+def draw_headless_frame(snowman, frame):
+    draw_frame(snowman, (frame % DANCE_FRAMES + 1) * 0.1)
+
+def main_headless():
+    global WIDTH, HEIGHT
+    WIDTH, HEIGHT = headless.frame_size((WIDTH, HEIGHT))
+    pygame.init()
+    try:
+        headless.run((WIDTH, HEIGHT), init_scene, draw_headless_frame)
+    finally:
+        pygame.quit()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if headless.options is not None:
+        main_headless()
+    else:
+        main()
\ No newline at end of file
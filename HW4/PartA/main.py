@@ -1,14 +1,13 @@
-import os
 import math
 import pygame
 from OpenGL.GL import *
 from OpenGL.GLU import *
-
-# Pillow (PIL) for loading textures
-try:
-    from PIL import Image
-except ImportError:
-    raise SystemExit("Missing Pillow. Install with: python -m pip install Pillow")
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared")) # headless, mesh_cache, textures, ...: one copy for every lab
+from resources import acquire_quadric, release_quadric
+from textures import load_texture, release_texture
+from text_atlas import glyph_atlas, TextBatch, delete_atlases
 
 # -------------------------
 # Config
@@ -59,62 +58,9 @@ def cross(a, b):
 # -------------------------
 # Texture loading (floor)
 # -------------------------
-def load_texture(path: str) -> int:
-    """Load an image as an OpenGL RGB texture with GL_REPEAT tiling."""
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Texture not found: {path}")
-
-    tex = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, tex)
-
-    img = Image.open(path).convert("RGB").transpose(Image.FLIP_TOP_BOTTOM)
-    data = img.tobytes()
-
-    glTexImage2D(
-        GL_TEXTURE_2D, 0, GL_RGB,
-        img.width, img.height, 0,
-        GL_RGB, GL_UNSIGNED_BYTE, data
-    )
-
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-
-    # Repeat pattern across the floor
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-
-    glBindTexture(GL_TEXTURE_2D, 0)
-    return tex
-
-
 # -------------------------
-# OpenGL overlay text (PyGame font -> GL texture)
+# 2D overlay (text comes from text_atlas.py)
 # -------------------------
-def create_text_texture(font, text, color=(255, 255, 255), bg=(0, 0, 0, 180)):
-    """
-    Render text to a PyGame RGBA surface, upload it as an OpenGL texture.
-    Returns (tex_id, w, h).
-    """
-    text_surf = font.render(text, True, color)
-    w, h = text_surf.get_size()
-
-    box = pygame.Surface((w + 10, h + 6), pygame.SRCALPHA)
-    box.fill(bg)
-    box.blit(text_surf, (5, 3))
-
-    tex_data = pygame.image.tostring(box, "RGBA", True)
-    tw, th = box.get_size()
-
-    tex_id = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, tex_id)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, tw, th, 0, GL_RGBA, GL_UNSIGNED_BYTE, tex_data)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glBindTexture(GL_TEXTURE_2D, 0)
-
-    return tex_id, tw, th
-
-
 def begin_2d():
     """Switch to 2D pixel coordinate rendering (0,0)=top-left."""
     glMatrixMode(GL_PROJECTION)
@@ -147,25 +93,6 @@ def end_2d():
     glMatrixMode(GL_MODELVIEW)
 
 
-def draw_tex_2d(tex_id, x, y, w, h):
-    glDisable(GL_CULL_FACE)           # ensure it can’t be culled
-    glEnable(GL_TEXTURE_2D)
-    glBindTexture(GL_TEXTURE_2D, tex_id)
-
-    glColor4f(1, 1, 1, 1)
-    glBegin(GL_QUADS)
-    # Correct mapping for glOrtho(0, W, H, 0, ...) (top-left origin)
-    glTexCoord2f(0, 1); glVertex2f(x,     y)      # top-left
-    glTexCoord2f(1, 1); glVertex2f(x + w, y)      # top-right
-    glTexCoord2f(1, 0); glVertex2f(x + w, y + h)  # bottom-right
-    glTexCoord2f(0, 0); glVertex2f(x,     y + h)  # bottom-left
-    glEnd()
-
-    glBindTexture(GL_TEXTURE_2D, 0)
-    glDisable(GL_TEXTURE_2D)
-
-
-
 # -------------------------
 # Scene setup
 # -------------------------
@@ -251,8 +178,8 @@ def draw_sphere(x, y, z, r, transparent=False):
     glPushMatrix()
     glTranslatef(x, y, z)
 
-    quad = gluNewQuadric()
-    gluQuadricNormals(quad, GLU_SMOOTH)
+    # shared quadric (see resources.py); main() holds a reference for the whole run
+    quad = acquire_quadric()
 
     if transparent:
         # Reliable transparency in fixed pipeline:
@@ -280,6 +207,7 @@ def draw_sphere(x, y, z, r, transparent=False):
         glDisable(GL_BLEND)
 
     glPopMatrix()
+    release_quadric()
 
 
 # -------------------------
@@ -356,8 +284,6 @@ def handle_input():
 def main():
     pygame.init()
     pygame.display.set_mode((WIN_W, WIN_H), pygame.DOUBLEBUF | pygame.OPENGL)
-    pygame.font.init()
-    font = pygame.font.SysFont("Consolas", 16)
     pygame.display.set_caption("Demo: Textured Floor + Transparent Sphere + OpenGL Text Overlay")
 
     overlay_lines = [
@@ -373,12 +299,11 @@ def main():
 
     # Load floor texture (your bird tessellation)
     tex = load_texture("chess.png")
+    acquire_quadric() # keeps the spheres' quadric alive between frames
 
-    # Pre-create text textures once (fast and reliable)
-    overlay_tex = []
-    for line in overlay_lines:
-        tid, tw, th = create_text_texture(font, line)
-        overlay_tex.append((tid, tw, th))
+    # Overlay text: built once, drawn as one batch from the glyph atlas
+    overlay = TextBatch(glyph_atlas("Consolas", 16))
+    overlay.add_lines(overlay_lines, 10, 10)
 
     clock = pygame.time.Clock()
     running = True
@@ -401,19 +326,18 @@ def main():
 
             # 2D OpenGL overlay
             begin_2d()
-            x, y = 10, 10
-            for (tid, tw, th) in overlay_tex:
-                draw_tex_2d(tid, x, y, tw, th)
-                y += th + 6
+            overlay.draw()
             end_2d()
 
             pygame.display.flip()
             clock.tick(FPS)
 
     finally:
-        # Cleanup overlay textures
-        for (tid, _, _) in overlay_tex:
-            glDeleteTextures([tid])
+        # Cleanup overlay text
+        overlay.delete()
+        delete_atlases()
+        release_quadric()
+        release_texture(tex)
         pygame.quit()
 
 
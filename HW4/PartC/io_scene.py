@@ -1,40 +1,264 @@
+import os
+import gc
 import json
-from objects import SphereObject
+import struct
+import threading
+import numpy as np
+from scene import Scene
+
+# Scene files come in three formats, picked by extension on save and by the
+# first bytes on load:
+#   .bin / .scene  binary: a header, then one packed float32 column per attribute
+#   .jsonl         JSON lines: one object per line, written and read as a stream
+#   anything else  the original indented JSON list
+BINARY_EXTENSIONS = (".bin", ".scene")
+JSONL_EXTENSIONS = (".jsonl",)
+
+# magic, format version, object count (16 bytes, so the columns stay aligned)
+BINARY_MAGIC = b"HWSCENE\0"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<8sII")
+# float32 columns in file order and their width per object
+BINARY_COLUMNS = (("pos", 3), ("radius", 1), ("color", 4), ("material", 2)) # material: specular, shininess
+
+# objects written / parsed between progress updates
+CHUNK = 4096
+
+def scene_format(filename):
+    name = filename.lower()
+    if name.endswith(BINARY_EXTENSIONS):
+        return "binary"
+    if name.endswith(JSONL_EXTENSIONS):
+        return "jsonl"
+    return "json"
+
+def detect_format(filename):
+    """Format of an existing file from its content: the binary magic, a JSON list or JSON lines."""
+    with open(filename, 'rb') as f:
+        head = f.read(256)
+    if head.startswith(BINARY_MAGIC):
+        return "binary"
+    return "json" if head.lstrip()[:1] == b"[" else "jsonl"
+
+def scene_columns(scene):
+    """
+    Snapshot of the scene's spheres as (positions, radii, colors, materials)
+    copies, cheap enough to take on the main thread; saving works from these.
+    """
+    spheres = ~np.isnan(scene.radii)
+    return (scene.positions[spheres].copy(), scene.radii[spheres].copy(),
+            scene.colors[spheres].copy(), scene.materials[spheres].copy())
 
 def save_scene(scene, filename="scene.json"):
-    data = []
-    for obj in scene.objects:
-        if hasattr(obj, 'to_dict'):
-            data.append(obj.to_dict())
-    
     try:
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=4)
+        write_columns(scene_columns(scene), filename)
         print(f"Scene saved to {filename}")
     except Exception as e:
         print(f"Error saving scene: {e}")
 
 def load_scene(scene, filename="scene.json"):
     try:
-        with open(filename, 'r') as f:
-            data = json.load(f)
-        
-        scene.objects = [] # Clear current scene
-        for item in data:
-            if item["type"] == "sphere":
-                p = item["pos"]
-                c = item["color"]
-                # SphereObject(x, y, z, radius, r, g, b, a, shininess, specular)
-                obj = SphereObject(
-                    p[0], p[1], p[2], 
-                    item["radius"], 
-                    c[0], c[1], c[2], c[3],
-                    item.get("shininess", 30.0),
-                    item.get("specular", 0.5)
-                )
-                scene.add_object(obj)
+        columns = read_columns(filename)
+        scene.clear() # Clear current scene (and its picking grid)
+        scene.add_spheres(*columns)
         print(f"Scene loaded from {filename}")
     except FileNotFoundError:
         print("Save file not found.")
     except Exception as e:
-        print(f"Error loading scene: {e}")
\ No newline at end of file
+        print(f"Error loading scene: {e}")
+
+# --- Writing ---
+
+def write_columns(columns, filename, progress=None):
+    """
+    Write a scene_columns() snapshot in the format of the file name. The file
+    is written under a temporary name and renamed at the end, so an
+    interrupted save never leaves a half-written scene behind.
+    """
+    progress = progress or (lambda fraction: None)
+    fmt = scene_format(filename)
+    tmp = filename + ".tmp"
+    with open(tmp, 'wb' if fmt == "binary" else 'w') as f:
+        if fmt == "binary":
+            write_binary(columns, f, progress)
+        elif fmt == "jsonl":
+            write_jsonl(columns, f, progress)
+        else:
+            write_json(columns, f, progress)
+    os.replace(tmp, filename)
+    progress(1.0)
+
+def sphere_dicts(columns, start, stop):
+    positions, radii, colors, materials = (c[start:stop].tolist() for c in columns)
+    for p, r, c, m in zip(positions, radii, colors, materials):
+        yield {
+            "type": "sphere",
+            "pos": p,
+            "radius": r,
+            "color": c,
+            "shininess": m[1],
+            "specular": m[0]
+        }
+
+def write_binary(columns, f, progress):
+    f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(columns[1])))
+    for i, column in enumerate(columns):
+        f.write(np.ascontiguousarray(column, dtype='<f4').tobytes())
+        progress((i + 1) / len(columns))
+
+def write_json(columns, f, progress):
+    # same layout as json.dump(list, indent=4), written a chunk at a time
+    count = len(columns[1])
+    f.write("[")
+    for start in range(0, count, CHUNK):
+        for i, item in enumerate(sphere_dicts(columns, start, start + CHUNK)):
+            f.write(",\n    " if start + i else "\n    ")
+            f.write(json.dumps(item, indent=4).replace("\n", "\n    "))
+        progress(min(start + CHUNK, count) / count)
+    f.write("\n]" if count else "]")
+
+def write_jsonl(columns, f, progress):
+    count = len(columns[1])
+    for start in range(0, count, CHUNK):
+        for item in sphere_dicts(columns, start, start + CHUNK):
+            f.write(json.dumps(item))
+            f.write("\n")
+        progress(min(start + CHUNK, count) / count)
+
+# --- Reading ---
+
+def read_columns(filename, progress=None):
+    """
+    (positions, radii, colors, materials) arrays of the spheres in a scene
+    file of any format; for a binary file they map the file and copy nothing.
+    """
+    progress = progress or (lambda fraction: None)
+    fmt = detect_format(filename)
+    if fmt == "binary":
+        # the memory-mapped float32 columns as they are; Scene.add_spheres
+        # converts them with one slice assignment per column into its store
+        columns = read_binary(filename)
+    elif fmt == "jsonl":
+        with open(filename, 'rb') as f: # binary mode, so tell() works while iterating
+            size = max(os.fstat(f.fileno()).st_size, 1)
+            columns = dicts_to_columns(read_jsonl(f), lambda: progress(0.99 * f.tell() / size))
+    else:
+        with open(filename, 'r') as f:
+            data = json.load(f)
+        progress(0.5)
+        columns = dicts_to_columns(data, lambda: None)
+    progress(1.0)
+    return columns
+
+def dicts_to_columns(items, progress):
+    positions, radii, colors, materials = [], [], [], []
+    for i, item in enumerate(items):
+        if item["type"] == "sphere":
+            positions.append(item["pos"])
+            radii.append(item["radius"])
+            colors.append(item["color"])
+            materials.append((item.get("specular", 0.5), item.get("shininess", 30.0)))
+        if i % CHUNK == CHUNK - 1:
+            progress()
+    return (np.array(positions, dtype=np.float64).reshape(-1, 3), np.array(radii, dtype=np.float64),
+            np.array(colors, dtype=np.float64).reshape(-1, 4), np.array(materials, dtype=np.float64).reshape(-1, 2))
+
+def read_binary(filename):
+    """
+    (positions, radii, colors, materials) arrays of a binary scene file.
+    The file is memory-mapped, so only the pages that are read get loaded.
+    """
+    with open(filename, 'rb') as f:
+        magic, version, count = BINARY_HEADER.unpack(f.read(BINARY_HEADER.size))
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f"not a version {BINARY_VERSION} binary scene")
+
+    width = sum(w for _, w in BINARY_COLUMNS)
+    data = np.memmap(filename, dtype='<f4', mode='r', offset=BINARY_HEADER.size, shape=(count * width,))
+    columns = []
+    start = 0
+    for _, w in BINARY_COLUMNS:
+        columns.append(data[start:start + count * w].reshape(count, w) if w > 1 else data[start:start + count])
+        start += count * w
+    return columns
+
+def read_jsonl(f):
+    """Objects of a JSON-lines file, one line at a time, so huge scenes never sit in memory as text."""
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+# --- Background save / load ---
+
+class SceneTask:
+    """
+    A save or load running on a worker thread. The main loop polls it once
+    per frame (progress for the caption) and calls finish() when done; only
+    finish() touches the scene, so the swap happens on the main thread. A
+    load builds a whole new Scene on the worker (store, handles and grid),
+    which finish() only swaps in.
+    """
+
+    def __init__(self, kind, filename, work):
+        self.kind = kind # "save" or "load"
+        self.filename = filename
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, args=(work,), daemon=True)
+        self.thread.start()
+
+    def run(self, work):
+        try:
+            self.result = work(self.set_progress)
+        except Exception as e:
+            self.error = e
+
+    def set_progress(self, fraction):
+        self.progress = fraction
+
+    @property
+    def done(self):
+        return not self.thread.is_alive()
+
+    def status(self):
+        return f"{'Saving' if self.kind == 'save' else 'Loading'} {self.filename}: {self.progress * 100:.0f}%"
+
+    def finish(self, scene):
+        """Main thread, once done: report the outcome; a finished load replaces the scene's objects."""
+        self.thread.join()
+        if isinstance(self.error, FileNotFoundError):
+            print("Save file not found.")
+        elif self.error is not None:
+            print(f"Error {'saving' if self.kind == 'save' else 'loading'} scene: {self.error}")
+        elif self.kind == "save":
+            print(f"Scene saved to {self.filename}")
+        else:
+            scene.take_objects(self.result) # a swap: the objects and grid are built already
+            print(f"Scene loaded from {self.filename}")
+        return self.error is None
+
+def save_scene_async(scene, filename="scene.json"):
+    """Snapshot the scene now and write it on a worker thread."""
+    columns = scene_columns(scene)
+    return SceneTask("save", filename, lambda progress: write_columns(columns, filename, progress))
+
+def build_scene(filename, progress):
+    """A new Scene holding the spheres of a scene file; no GL calls, so it can run on a worker thread."""
+    # the grid creates a few Python objects per sphere, and the cyclic garbage
+    # collector would scan them all again and again while holding the GIL (a
+    # stall of the render thread each time); nothing here creates cycles
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        loaded = Scene()
+        loaded.add_spheres(*read_columns(filename, lambda fraction: progress(0.5 * fraction)))
+    finally:
+        if collecting:
+            gc.enable()
+    progress(1.0)
+    return loaded
+
+def load_scene_async(filename="scene.json"):
+    """Read a scene file and build its objects on a worker thread; finish(scene) swaps them in."""
+    return SceneTask("load", filename, lambda progress: build_scene(filename, progress))
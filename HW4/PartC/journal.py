@@ -0,0 +1,188 @@
+import os
+import json
+from objects import SphereObject
+from io_scene import scene_columns, write_columns, read_columns
+
+# Autosave: every edit is appended to a journal (JSON lines), so an autosave
+# only writes what changed since the last one. Once the journal gets long it is
+# compacted: the whole scene goes into a fresh binary snapshot and the journal
+# starts over. After a crash, recover() loads the snapshot and replays the journal.
+#
+# Journal lines:
+#   {"op": "snapshot", "file": "autosave.3.bin"}       first line: the snapshot it applies to
+#   {"op": "add", "row": 5, "obj": {...to_dict()...}}
+#   {"op": "pos", "row": 5, "value": [x, y, z]}         move
+#   {"op": "color", "row": 5, "value": [r, g, b, a]}    recolor
+#   {"op": "light", "value": [x, y, z, w]}              light move
+AUTOSAVE_SECONDS = 2.0
+COMPACT_ENTRIES = 5000 # journal lines before the next autosave compacts instead
+
+class SceneJournal:
+    """
+    Append-only edit journal of one Scene (see the format above). The scene
+    calls the record_* methods as it is edited (Scene.journal); autosave()
+    writes the pending entries. Settings of the same value (a position, a
+    color, the light) made between two autosaves are coalesced, so holding a
+    movement key for a second costs one line, not sixty.
+    """
+
+    def __init__(self, path="autosave.journal"):
+        self.path = path
+        self.directory = os.path.dirname(path) or "."
+        self.prefix = os.path.splitext(os.path.basename(path))[0]
+        self.generation = 0
+        self.entries = 0 # lines in the journal file
+        self.adds = [] # pending add lines, in order
+        self.sets = {} # pending (op, row) -> value; applied after the adds
+        self.light = None
+        self.needs_compaction = True
+        self.file = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    # --- Recording (called by the Scene / the editor) ---
+
+    def record_add(self, row, obj):
+        if not self.needs_compaction and hasattr(obj, 'to_dict'):
+            self.adds.append({"op": "add", "row": row, "obj": obj.to_dict()})
+
+    def record_set(self, op, row, value):
+        if not self.needs_compaction:
+            self.sets[(op, row)] = list(value)
+
+    def record_light(self, light_pos):
+        self.light = list(light_pos)
+        if not self.needs_compaction:
+            self.sets[("light", None)] = self.light
+
+    def record_bulk_change(self):
+        """The scene changed wholesale (cleared, loaded): the next autosave writes a snapshot."""
+        self.needs_compaction = True
+        self.adds = []
+        self.sets = {}
+
+    # --- Writing ---
+
+    def autosave(self, scene):
+        """Append the pending edits (or compact); returns the number of lines written."""
+        if self.needs_compaction or self.entries + len(self.adds) + len(self.sets) > COMPACT_ENTRIES:
+            self.compact(scene)
+            return self.entries
+        if not self.adds and not self.sets:
+            return 0
+
+        lines = self.adds
+        for (op, row), value in self.sets.items():
+            entry = {"op": op, "value": value}
+            if row is not None:
+                entry["row"] = row
+            lines.append(entry)
+        self.adds = []
+        self.sets = {}
+        self.write_lines(lines)
+        return len(lines)
+
+    def write_lines(self, lines):
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        self.file.write("".join(json.dumps(line) + "\n" for line in lines))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.entries += len(lines)
+
+    def snapshot_path(self, generation):
+        return os.path.join(self.directory, f"{self.prefix}.{generation}.bin")
+
+    def compact(self, scene):
+        """
+        Write the whole scene to a new snapshot and restart the journal on it.
+        The new journal replaces the old one in one rename, so a crash at any
+        point leaves a journal that matches the snapshot it names.
+        """
+        old_snapshot = self.snapshot_path(self.generation)
+        self.generation += 1
+        snapshot = self.snapshot_path(self.generation)
+        write_columns(scene_columns(scene), snapshot)
+
+        lines = [{"op": "snapshot", "file": os.path.basename(snapshot)}]
+        if self.light is not None:
+            lines.append({"op": "light", "value": self.light})
+        self.close()
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            f.write("".join(json.dumps(line) + "\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if os.path.exists(old_snapshot):
+            os.remove(old_snapshot)
+
+        self.entries = len(lines)
+        self.adds = []
+        self.sets = {}
+        self.needs_compaction = False
+
+    # --- Recovery ---
+
+    def recover(self, scene):
+        """
+        Rebuild the scene from the snapshot and the journal after a crash;
+        returns the last light position (or None). A torn last line, from a
+        crash in the middle of a write, is ignored.
+        """
+        with open(self.path, 'r') as f:
+            lines = f.readlines()
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+
+        snapshot = os.path.join(self.directory, entries[0]["file"])
+        self.generation = int(entries[0]["file"].split(".")[-2])
+        journal, scene.journal = scene.journal, None # replaying must not record again
+        scene.clear()
+        scene.add_spheres(*read_columns(snapshot))
+
+        for entry in entries[1:]:
+            op = entry["op"]
+            if op == "add":
+                obj = object_from_dict(entry["obj"])
+                if obj is not None:
+                    scene.add_object(obj)
+            elif op == "pos":
+                obj = scene.objects[entry["row"]]
+                p = entry["value"]
+                scene.move_object(obj, p[0] - obj.pos[0], p[1] - obj.pos[1], p[2] - obj.pos[2])
+            elif op == "color":
+                scene.set_color(scene.objects[entry["row"]], *entry["value"])
+            elif op == "light":
+                self.light = entry["value"]
+        scene.journal = journal
+
+        # continue on a fresh snapshot, so the replayed edits are not replayed twice
+        self.needs_compaction = True
+        return self.light
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        """Clean exit: nothing to recover next time."""
+        self.close()
+        for path in (self.path, self.snapshot_path(self.generation)):
+            if os.path.exists(path):
+                os.remove(path)
+
+def object_from_dict(item):
+    if item["type"] == "sphere":
+        p = item["pos"]
+        c = item["color"]
+        # SphereObject(x, y, z, radius, r, g, b, a, shininess, specular)
+        return SphereObject(p[0], p[1], p[2], item["radius"], c[0], c[1], c[2], c[3],
+                            item.get("shininess", 30.0), item.get("specular", 0.5))
+    return None
@@ -1,16 +1,23 @@
 import pygame
 from pygame.locals import *
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared")) # headless, mesh_cache, textures, ...: one copy for every lab
+import headless  # before OpenGL: selects the offscreen GL platform for --headless runs
 from OpenGL.GL import *
 from OpenGL.GLU import *
-from PIL import Image
 import math
 import random  # Added for random object generation
 
 # Import our modules
 from objects import SphereObject
 from scene import Scene
-from picking import get_ray_from_mouse, ray_sphere_intersect
-from io_scene import save_scene, load_scene
+from picking import get_ray_from_mouse
+from io_scene import save_scene_async, load_scene_async
+from journal import SceneJournal, AUTOSAVE_SECONDS
+from textures import load_texture
+from profiler import FrameProfiler, FrameHud
+from text_atlas import glyph_atlas, TextBatch
 
 # Config
 WIN_W, WIN_H = 1024, 768
@@ -38,23 +45,39 @@ current_mode = MODE_CAMERA
 # Selected Object
 selected_obj = None
 
-def load_texture(path):
-    try:
-        img = Image.open(path).convert("RGB")
-        img = img.transpose(Image.FLIP_TOP_BOTTOM)
-        data = img.tobytes()
-        
-        tex = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, tex)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, img.width, img.height, 0, GL_RGB, GL_UNSIGNED_BYTE, data)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-        return tex
-    except:
-        print(f"Texture {path} not found. Floor will be white.")
-        return 0
+# Frame-time profiler (F3: show HUD, F4: write CSV/JSON traces)
+profiler = FrameProfiler(gl_timer=True)
+show_hud = False
+
+# --- 2D Overlay (text comes from text_atlas.py) ---
+def begin_2d():
+    """Switch to 2D pixel coordinates, (0,0) = top-left."""
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, WIN_W, WIN_H, 0, -1, 1)
+
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+def end_2d():
+    glDisable(GL_BLEND)
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_LIGHTING)
+
+    glMatrixMode(GL_MODELVIEW)
+    glPopMatrix()
+
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+
+    glMatrixMode(GL_MODELVIEW)
 
 # --- Math Helpers for Camera ---
 def normalize(v):
@@ -97,28 +120,14 @@ def handle_picking(x, y, scene):
     
     if not ray_origin: return
 
-    closest_dist = float('inf')
-    hit_obj = None
-
-    for obj in scene.objects:
-        if isinstance(obj, SphereObject):
-            dist = ray_sphere_intersect(ray_origin, ray_dir, obj.pos, obj.radius)
-            if dist is not None and dist < closest_dist:
-                closest_dist = dist
-                hit_obj = obj
+    # nearest sphere along the ray, using the scene's spatial grid
+    hit_obj = scene.pick(ray_origin, ray_dir)
     
-    if selected_obj: selected_obj.selected = False
     selected_obj = hit_obj
-    if selected_obj: selected_obj.selected = True
-
-def main():
-    global camera_yaw, camera_pitch, camera_dist, camera_target
-    global last_mouse, orbiting, panning, current_mode, light_pos, selected_obj
-
-    pygame.init()
-    screen = pygame.display.set_mode((WIN_W, WIN_H), DOUBLEBUF | OPENGL)
-    pygame.display.set_caption("Challenge HW: Interactive Scene Editor")
+    scene.select(hit_obj)
 
+def init_scene():
+    """GL state and the starting scene; returns the Scene draw_frame() renders."""
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_LIGHTING)
     glEnable(GL_LIGHT0)
@@ -128,7 +137,10 @@ def main():
     glClearColor(0.1, 0.1, 0.1, 1.0)
 
     main_scene = Scene()
-    main_scene.floor_texture = load_texture("floor.jpg")
+    try:
+        main_scene.floor_texture = load_texture("floor.jpg")
+    except Exception:
+        print("Texture floor.jpg not found. Floor will be white.")
 
     # --- Initial Objects ---
     # Red (Opaque), Green (Transparent 0.5), Blue (Transparent 0.5)
@@ -136,134 +148,231 @@ def main():
     main_scene.add_object(SphereObject(0, 1, 0, 1.0, 0, 1, 0, 0.5))  
     main_scene.add_object(SphereObject(3, 1, 0, 1.0, 0, 0, 1, 0.5))  
 
+    return main_scene
+
+def draw_frame(main_scene):
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    gluPerspective(45, (WIN_W / WIN_H), 0.1, 100.0)
+
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    
+    # Recalculate eye for gluLookAt
+    eye, _, _ = get_camera_vectors()
+    gluLookAt(eye[0], eye[1], eye[2], 
+              camera_target[0], camera_target[1], camera_target[2], 
+              0, 1, 0)
+
+    glLightfv(GL_LIGHT0, GL_POSITION, light_pos)
+    main_scene.draw(eye)
+
+def main():
+    global camera_yaw, camera_pitch, camera_dist, camera_target
+    global last_mouse, orbiting, panning, current_mode, light_pos, selected_obj, show_hud
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIN_W, WIN_H), DOUBLEBUF | OPENGL)
+    pygame.display.set_caption("Challenge HW: Interactive Scene Editor")
+
+    main_scene = init_scene()
+
+    # Autosave journal: left behind only by a crash, so recover from it if present
+    journal = SceneJournal()
+    if journal.exists():
+        try:
+            light = journal.recover(main_scene)
+            if light: light_pos[:] = light
+            print(f"Recovered the autosaved scene ({main_scene.count} objects)")
+        except Exception as e:
+            print(f"Error recovering autosave: {e}")
+            journal.record_bulk_change()
+    journal.record_light(light_pos)
+    main_scene.journal = journal
+    last_autosave = pygame.time.get_ticks()
+
+    hud = FrameHud(profiler, glyph_atlas("Consolas", 14), 1000.0 / FPS)
+    status = TextBatch(glyph_atlas("Consolas", 16)) # rebuilt every frame
+
     clock = pygame.time.Clock()
+    scene_task = None # background save / load in progress
 
     while True:
-        # 1. Event Handling
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit(); return
+        profiler.begin_frame()
+        with profiler.phase("input"):
+            # 1. Event Handling
+            for event in pygame.event.get():
+                if event.type == QUIT:
+                    journal.discard(); pygame.quit(); return
             
-            if event.type == KEYDOWN:
-                if event.key == K_ESCAPE: pygame.quit(); return
+                if event.type == KEYDOWN:
+                    if event.key == K_ESCAPE: journal.discard(); pygame.quit(); return
                 
-                # Mode Switching
-                if event.key == K_TAB:
-                    current_mode = MODE_LIGHT if current_mode == MODE_CAMERA else MODE_CAMERA
+                    # Mode Switching
+                    if event.key == K_TAB:
+                        current_mode = MODE_LIGHT if current_mode == MODE_CAMERA else MODE_CAMERA
                 
-                # Save/Load
-                mods = pygame.key.get_mods()
-                if (mods & KMOD_CTRL):
-                    if event.key == K_s: save_scene(main_scene)
-                    if event.key == K_l: load_scene(main_scene)
-
-                # --- NEW: ADD RANDOM OBJECT (Press 'A') ---
-                if event.key == K_a:
-                    rx = random.uniform(-5, 5)
-                    rz = random.uniform(-5, 5)
-                    rr, rg, rb = random.random(), random.random(), random.random()
-                    # 50% chance of being transparent
-                    ra = 0.5 if random.random() > 0.5 else 1.0
+                    # Save/Load
+                    mods = pygame.key.get_mods()
+                    # (on a worker thread, one at a time; the window keeps rendering meanwhile)
+                    if (mods & KMOD_CTRL) and scene_task is None:
+                        if event.key == K_s: scene_task = save_scene_async(main_scene)
+                        if event.key == K_l: scene_task = load_scene_async()
+
+                    # Profiler HUD / traces
+                    if event.key == K_F3: show_hud = not show_hud
+                    if event.key == K_F4:
+                        print(f"Frame trace written to {profiler.write_traces()}.csv/.json")
+
+                    # Transparency: sorted blending <-> order-independent (Press 'T')
+                    if event.key == K_t:
+                        main_scene.use_oit = not main_scene.use_oit
+
+                    # --- NEW: ADD RANDOM OBJECT (Press 'A') ---
+                    if event.key == K_a:
+                        rx = random.uniform(-5, 5)
+                        rz = random.uniform(-5, 5)
+                        rr, rg, rb = random.random(), random.random(), random.random()
+                        # 50% chance of being transparent
+                        ra = 0.5 if random.random() > 0.5 else 1.0
                     
-                    new_obj = SphereObject(rx, 1, rz, 1.0, rr, rg, rb, ra)
-                    main_scene.add_object(new_obj)
-                    print(f"Added sphere at {rx:.2f}, {rz:.2f} (Alpha: {ra})")
-
-            # --- MOUSE INPUTS ---
-            if event.type == MOUSEBUTTONDOWN:
-                mods = pygame.key.get_mods()
-                shift = (mods & KMOD_SHIFT)
-
-                # Zoom In/Out (Scroll Wheel)
-                if event.button == 4: camera_dist = max(2.0, camera_dist - 1.0)
-                if event.button == 5: camera_dist = min(100.0, camera_dist + 1.0)
-
-                # Left Click logic
-                if event.button == 1:
-                    if shift:
-                        panning = True
-                    else:
-                        orbiting = True
-                        # Only pick if we are NOT panning
-                        if current_mode == MODE_CAMERA:
-                             handle_picking(event.pos[0], event.pos[1], main_scene)
-
-            if event.type == MOUSEBUTTONUP:
-                if event.button == 1:
-                    orbiting = False
-                    panning = False
-
-        # 2. Continuous Input (Keyboard)
-        keys = pygame.key.get_pressed()
-        shift_held = keys[K_LSHIFT] or keys[K_RSHIFT]
-        move_speed = 0.05 if shift_held else 0.2
-
-        if current_mode == MODE_LIGHT:
-            if keys[K_UP]: light_pos[2] -= 0.2
-            if keys[K_DOWN]: light_pos[2] += 0.2
-            if keys[K_LEFT]: light_pos[0] -= 0.2
-            if keys[K_RIGHT]: light_pos[0] += 0.2
-            if keys[K_q]: light_pos[1] += 0.2
-            if keys[K_e]: light_pos[1] -= 0.2
-
-        if selected_obj:
-            if keys[K_i]: selected_obj.pos[2] -= move_speed
-            if keys[K_k]: selected_obj.pos[2] += move_speed
-            if keys[K_j]: selected_obj.pos[0] -= move_speed
-            if keys[K_l]: selected_obj.pos[0] += move_speed
-            if keys[K_u]: selected_obj.pos[1] += move_speed
-            if keys[K_o]: selected_obj.pos[1] -= move_speed
-
-        # 3. Mouse Motion (Orbit / Pan)
-        mx, my = pygame.mouse.get_pos()
-        if last_mouse:
-            dx = mx - last_mouse[0]
-            dy = my - last_mouse[1]
-
-            if panning:
-                eye, right, up = get_camera_vectors()
-                pan_speed = 0.01 * (camera_dist / 10.0)
+                        new_obj = SphereObject(rx, 1, rz, 1.0, rr, rg, rb, ra)
+                        main_scene.add_object(new_obj)
+                        print(f"Added sphere at {rx:.2f}, {rz:.2f} (Alpha: {ra})")
+
+                # --- MOUSE INPUTS ---
+                if event.type == MOUSEBUTTONDOWN:
+                    mods = pygame.key.get_mods()
+                    shift = (mods & KMOD_SHIFT)
+
+                    # Zoom In/Out (Scroll Wheel)
+                    if event.button == 4: camera_dist = max(2.0, camera_dist - 1.0)
+                    if event.button == 5: camera_dist = min(100.0, camera_dist + 1.0)
+
+                    # Left Click logic
+                    if event.button == 1:
+                        if shift:
+                            panning = True
+                        else:
+                            orbiting = True
+                            # Only pick if we are NOT panning
+                            if current_mode == MODE_CAMERA:
+                                 handle_picking(event.pos[0], event.pos[1], main_scene)
+
+                if event.type == MOUSEBUTTONUP:
+                    if event.button == 1:
+                        orbiting = False
+                        panning = False
+
+            # 2. Continuous Input (Keyboard)
+            keys = pygame.key.get_pressed()
+            shift_held = keys[K_LSHIFT] or keys[K_RSHIFT]
+            move_speed = 0.05 if shift_held else 0.2
+
+            if current_mode == MODE_LIGHT:
+                if keys[K_UP]: light_pos[2] -= 0.2
+                if keys[K_DOWN]: light_pos[2] += 0.2
+                if keys[K_LEFT]: light_pos[0] -= 0.2
+                if keys[K_RIGHT]: light_pos[0] += 0.2
+                if keys[K_q]: light_pos[1] += 0.2
+                if keys[K_e]: light_pos[1] -= 0.2
+                if light_pos != journal.light: journal.record_light(light_pos)
+
+            if selected_obj:
+                dx = dy = dz = 0.0
+                if keys[K_i]: dz -= move_speed
+                if keys[K_k]: dz += move_speed
+                if keys[K_j]: dx -= move_speed
+                if keys[K_l]: dx += move_speed
+                if keys[K_u]: dy += move_speed
+                if keys[K_o]: dy -= move_speed
+                if dx or dy or dz:
+                    main_scene.move_object(selected_obj, dx, dy, dz)
+
+            # 3. Mouse Motion (Orbit / Pan)
+            mx, my = pygame.mouse.get_pos()
+            if last_mouse:
+                dx = mx - last_mouse[0]
+                dy = my - last_mouse[1]
+
+                if panning:
+                    eye, right, up = get_camera_vectors()
+                    pan_speed = 0.01 * (camera_dist / 10.0)
                 
-                # Pan target
-                camera_target[0] -= right[0] * dx * pan_speed
-                camera_target[1] -= right[1] * dx * pan_speed
-                camera_target[2] -= right[2] * dx * pan_speed
+                    # Pan target
+                    camera_target[0] -= right[0] * dx * pan_speed
+                    camera_target[1] -= right[1] * dx * pan_speed
+                    camera_target[2] -= right[2] * dx * pan_speed
                 
-                camera_target[0] += up[0] * dy * pan_speed
-                camera_target[1] += up[1] * dy * pan_speed
-                camera_target[2] += up[2] * dy * pan_speed
-
-            elif orbiting:
-                camera_yaw += dx * 0.3
-                camera_pitch -= dy * 0.3
-                camera_pitch = max(-89, min(89, camera_pitch))
-
-        last_mouse = (mx, my)
+                    camera_target[0] += up[0] * dy * pan_speed
+                    camera_target[1] += up[1] * dy * pan_speed
+                    camera_target[2] += up[2] * dy * pan_speed
+
+                elif orbiting:
+                    camera_yaw += dx * 0.3
+                    camera_pitch -= dy * 0.3
+                    camera_pitch = max(-89, min(89, camera_pitch))
+
+            last_mouse = (mx, my)
+
+        with profiler.phase("simulation"):
+            # Swap in a finished load / report a finished save
+            if scene_task is not None and scene_task.done:
+                if scene_task.finish(main_scene) and scene_task.kind == "load":
+                    selected_obj = None # the old selection is not part of the loaded scene
+                scene_task = None
+
+            # Autosave: append the edits since the last one to the journal
+            if pygame.time.get_ticks() - last_autosave >= AUTOSAVE_SECONDS * 1000:
+                try:
+                    journal.autosave(main_scene)
+                except Exception as e:
+                    print(f"Error autosaving scene: {e}")
+                last_autosave = pygame.time.get_ticks()
 
         # 4. Rendering
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        gluPerspective(45, (WIN_W / WIN_H), 0.1, 100.0)
-
-        glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
-        
-        # Recalculate eye for gluLookAt
-        eye, _, _ = get_camera_vectors()
-        gluLookAt(eye[0], eye[1], eye[2], 
-                  camera_target[0], camera_target[1], camera_target[2], 
-                  0, 1, 0)
-
-        glLightfv(GL_LIGHT0, GL_POSITION, light_pos)
-        main_scene.draw(eye)
+        with profiler.phase("draw"):
+            draw_frame(main_scene)
+
+            mode_str = "LIGHT MODE (Arrows=XZ, Q/E=Y)" if current_mode == MODE_LIGHT else "CAMERA MODE (Shift+Drag=Pan)"
+            transparency_str = "OIT" if main_scene.use_oit else "Sorted"
+            task_str = f"{scene_task.status()} | " if scene_task is not None else ""
+            light_str = f"Light: {light_pos[0]:.1f},{light_pos[1]:.1f},{light_pos[2]:.1f}"
+
+            # On-screen status, rebuilt every frame from the glyph atlas (a vertex upload, no new textures)
+            begin_2d()
+            status.clear()
+            status.add(f"{task_str}{mode_str} | {light_str} | Transparency: {transparency_str} | Objects: {main_scene.count}",
+                       10, WIN_H - status.atlas.height - 16)
+            status.draw()
+            if show_hud:
+                hud.draw(10, 10)
+            end_2d()
+
+        pygame.display.set_caption(f"HW Editor | {task_str}{mode_str} | {light_str} | Transparency: {transparency_str} ('T') | 'A' to Add")
+
+        with profiler.phase("flip"):
+            pygame.display.flip()
+        clock.tick(FPS)
 
-        mode_str = "LIGHT MODE (Arrows=XZ, Q/E=Y)" if current_mode == MODE_LIGHT else "CAMERA MODE (Shift+Drag=Pan)"
-        pygame.display.set_caption(f"HW Editor | {mode_str} | Light: {light_pos[0]:.1f},{light_pos[1]:.1f},{light_pos[2]:.1f} | 'A' to Add")
+def draw_headless_frame(main_scene, frame):
+    global camera_yaw
+    camera_yaw = frame * headless.options.orbit
+    draw_frame(main_scene)
 
-        pygame.display.flip()
-        clock.tick(FPS)
+def main_headless():
+    global WIN_W, WIN_H
+    WIN_W, WIN_H = headless.frame_size((WIN_W, WIN_H))
+    pygame.init()
+    try:
+        headless.run((WIN_W, WIN_H), init_scene, draw_headless_frame)
+    finally:
+        pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if headless.options is not None:
+        main_headless()
+    else:
+        main()
\ No newline at end of file
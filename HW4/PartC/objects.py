@@ -1,12 +1,88 @@
 import math
+import numpy as np
 from OpenGL.GL import *
 from OpenGL.GLU import *
+from resources import acquire_quadric, release_quadric
+
+class ObjectStore:
+    """
+    Columnar storage of scene objects: one NumPy array per attribute, row i
+    holding one object's values. Objects are small handles (store, row) that
+    view into it, so code that works on whole scenes (drawing, sorting,
+    saving) uses the arrays directly. The arrays grow by doubling; rows
+    [0, count) are in use, and rows given back with free() are reused.
+    """
+
+    def __init__(self, capacity=16):
+        self.pos = np.zeros((capacity, 3))
+        self.color = np.zeros((capacity, 4))
+        self.radius = np.full(capacity, np.nan) # NaN: not a sphere
+        self.material = np.zeros((capacity, 2)) # specular, shininess
+        self.count = 0
+        self.free_rows = []
+
+    def reserve(self, capacity):
+        while capacity > len(self.radius):
+            n = len(self.radius)
+            self.pos = np.concatenate([self.pos, np.zeros((n, 3))])
+            self.color = np.concatenate([self.color, np.zeros((n, 4))])
+            self.radius = np.concatenate([self.radius, np.full(n, np.nan)])
+            self.material = np.concatenate([self.material, np.zeros((n, 2))])
+
+    def extend(self, n):
+        """Append n rows; returns the first."""
+        first = self.count
+        self.reserve(first + n)
+        self.count += n
+        return first
+
+    def allocate(self):
+        if self.free_rows:
+            return self.free_rows.pop()
+        return self.extend(1)
+
+    def free(self, row):
+        self.radius[row] = np.nan
+        self.free_rows.append(row)
+
+    def clear(self):
+        self.count = 0
+        self.free_rows = []
 
 class SceneObject:
+    # no per-object __dict__: an object is its row in a store plus a flag
+    __slots__ = ("store", "row", "selected")
+
     def __init__(self, x, y, z, r, g, b, a=1.0):
-        self.pos = [x, y, z]
-        self.color = [r, g, b, a]
+        # a one-row store of its own until Scene.add_object moves the values
+        # into the scene's; an object that is never added frees it with itself
+        self.store = ObjectStore(capacity=1)
+        self.row = self.store.allocate()
+        self.store.pos[self.row] = (x, y, z)
+        self.store.color[self.row] = (r, g, b, a)
         self.selected = False
+
+    # read-only views into the store: edits go through Scene.move_object /
+    # Scene.set_color, which also update the grid and the scene's version
+    @property
+    def pos(self):
+        view = self.store.pos[self.row]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def color(self):
+        view = self.store.color[self.row]
+        view.flags.writeable = False
+        return view
+
+    def attach(self, store):
+        """Move this object's values into a new row of store (e.g. a scene's); returns the row."""
+        row = store.allocate()
+        for name in ("pos", "color", "radius", "material"):
+            getattr(store, name)[row] = getattr(self.store, name)[self.row]
+        self.store, self.row = store, row
+        return row
         
     def is_transparent(self):
         # Objects are transparent if Alpha < 1.0
@@ -15,15 +91,54 @@ class SceneObject:
     def draw(self):
         raise NotImplementedError("Draw method must be implemented by subclasses")
 
+    def release(self):
+        """Give back shared GL resources once the object leaves the scene."""
+        pass
+
 class SphereObject(SceneObject):
+    __slots__ = ("quad",)
+
     def __init__(self, x, y, z, radius, r, g, b, a=1.0, shininess=30.0, specular=0.5):
         super().__init__(x, y, z, r, g, b, a)
-        self.radius = radius
-        self.shininess = shininess
-        self.specular = specular
-        self.quad = gluNewQuadric()
+        self.store.radius[self.row] = radius
+        self.store.material[self.row] = (specular, shininess)
+        self.quad = None # taken on the first GLU draw, see quadric()
+
+    @classmethod
+    def view(cls, store, row):
+        """Handle for a sphere whose values are already in store[row]."""
+        obj = cls.__new__(cls)
+        obj.store, obj.row, obj.selected, obj.quad = store, row, False, None
+        return obj
+
+    def quadric(self):
+        """
+        The shared GLU quadric (see resources.py), referenced from the first
+        gluSphere draw until release(). Instanced spheres never need it, and
+        an object that is never drawn holds no reference.
+        """
+        if self.quad is None:
+            self.quad = acquire_quadric()
+        return self.quad
+
+    @property
+    def radius(self):
+        return self.store.radius[self.row]
+
+    @property
+    def specular(self):
+        return self.store.material[self.row, 0]
+
+    @property
+    def shininess(self):
+        return self.store.material[self.row, 1]
 
     def draw(self):
+        self.draw_shape()
+        if self.selected:
+            self.draw_selection()
+
+    def draw_shape(self):
         glPushMatrix()
         glTranslatef(self.pos[0], self.pos[1], self.pos[2])
         
@@ -37,38 +152,46 @@ class SphereObject(SceneObject):
         glMaterialf(GL_FRONT, GL_SHININESS, self.shininess)
         
         # Draw Sphere
-        gluSphere(self.quad, self.radius, 32, 32)
-        
+        gluSphere(self.quadric(), self.radius, 32, 32)
+        glPopMatrix()
+
+    def release(self):
+        if self.quad is not None:
+            release_quadric()
+            self.quad = None
+
+    def draw_selection(self):
         # Selection Cue: Wireframe Overlay
-        if self.selected:
-            glDisable(GL_LIGHTING)
-            glDisable(GL_TEXTURE_2D)
-            glDepthFunc(GL_LEQUAL)
-            
-            # Draw RED wireframe
-            glColor3f(1.0, 0.0, 0.0) 
-            glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
-            
-            # Draw slightly larger wireframe sphere
-            gluSphere(self.quad, self.radius * 1.02, 16, 16)
-            
-            glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
-
-            # --- RESET COLOR TO WHITE ---
-            # Prevents floor and other objects from getting tinted red
-            glColor3f(1.0, 1.0, 1.0)
-            
-            glEnable(GL_LIGHTING)
-            glDepthFunc(GL_LESS)
-            
+        glPushMatrix()
+        glTranslatef(self.pos[0], self.pos[1], self.pos[2])
+        glDisable(GL_LIGHTING)
+        glDisable(GL_TEXTURE_2D)
+        glDepthFunc(GL_LEQUAL)
+        
+        # Draw RED wireframe
+        glColor3f(1.0, 0.0, 0.0) 
+        glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
+        
+        # Draw slightly larger wireframe sphere
+        gluSphere(self.quadric(), self.radius * 1.02, 16, 16)
+        
+        glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
+
+        # --- RESET COLOR TO WHITE ---
+        # Prevents floor and other objects from getting tinted red
+        glColor3f(1.0, 1.0, 1.0)
+        
+        glEnable(GL_LIGHTING)
+        glDepthFunc(GL_LESS)
+        
         glPopMatrix()
 
     def to_dict(self):
         return {
             "type": "sphere",
-            "pos": self.pos,
-            "radius": self.radius,
-            "color": self.color,
-            "shininess": self.shininess,
-            "specular": self.specular
+            "pos": self.pos.tolist(),
+            "radius": float(self.radius),
+            "color": self.color.tolist(),
+            "shininess": float(self.shininess),
+            "specular": float(self.specular)
         }
\ No newline at end of file
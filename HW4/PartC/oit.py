@@ -0,0 +1,171 @@
+import numpy as np
+from OpenGL.GL import *
+from sphere_batch import VERTEX_SHADER, compile_program
+
+# Weighted blended order-independent transparency (McGuire & Bavoil 2013).
+# Transparent fragments are summed into two offscreen targets in any order:
+#   accumulation (RGBA16F): sum of w * (premultiplied rgb, alpha)
+#   revealage    (R16F):    product of (1 - alpha), i.e. how much of the background shows
+# and a full-screen composite pass blends their weighted average over the opaque scene.
+# The weight favours fragments close to the camera, so the nearest surface dominates
+# where transparent objects overlap or intersect; nothing has to be sorted.
+ACCUMULATE_SHADER = """
+#version 120
+void main()
+{
+    // distance to the camera from the depth value (perspective projection)
+    float z_ndc = gl_FragCoord.z * 2.0 - 1.0;
+    float dist = gl_ProjectionMatrix[3][2] / (z_ndc + gl_ProjectionMatrix[2][2]);
+
+    float a = gl_Color.a;
+    float w = a * clamp(0.03 / (1e-5 + pow(dist / 200.0, 4.0)), 1e-2, 3e3);
+    gl_FragData[0] = vec4(gl_Color.rgb * a, a) * w;
+    gl_FragData[1] = vec4(a);
+}
+"""
+
+COMPOSITE_VERTEX_SHADER = """
+#version 120
+void main()
+{
+    gl_Position = gl_Vertex; // full-screen quad in clip space
+}
+"""
+
+COMPOSITE_FRAGMENT_SHADER = """
+#version 120
+uniform sampler2D accumulation;
+uniform sampler2D revealage;
+uniform vec4 viewport;
+
+void main()
+{
+    vec2 uv = (gl_FragCoord.xy - viewport.xy) / viewport.zw;
+    float reveal = texture2D(revealage, uv).r;
+    if (reveal >= 1.0)
+        discard; // no transparent fragment here
+    vec4 accum = texture2D(accumulation, uv);
+    // blended with GL_ONE_MINUS_SRC_ALPHA, GL_SRC_ALPHA: the opaque scene keeps `reveal`
+    gl_FragColor = vec4(accum.rgb / clamp(accum.a, 1e-4, 5e4), reveal);
+}
+"""
+
+
+class WeightedBlendedOIT:
+    """
+    Order-independent transparency pass. Call begin() after the opaque
+    objects are drawn, draw the transparent ones in any order with
+    sphere_program (instanced spheres) or object_program (fixed-function
+    geometry) bound, then end() composites them over the current framebuffer.
+    The targets follow the viewport size. Needs a GL context with float
+    render targets and per-buffer blending (OpenGL 4.0); raises otherwise.
+    """
+
+    def __init__(self):
+        if not bool(glBlendFunci) or not bool(glClearBufferfv):
+            raise RuntimeError("per-buffer blending is not supported")
+        self.sphere_program = compile_program(VERTEX_SHADER, ACCUMULATE_SHADER)
+        self.object_program = compile_program(None, ACCUMULATE_SHADER)
+        self.composite_program = compile_program(COMPOSITE_VERTEX_SHADER, COMPOSITE_FRAGMENT_SHADER)
+        glUseProgram(self.composite_program)
+        glUniform1i(glGetUniformLocation(self.composite_program, "accumulation"), 0)
+        glUniform1i(glGetUniformLocation(self.composite_program, "revealage"), 1)
+        glUseProgram(0)
+
+        self.fbo = None
+        self.textures = []
+        self.size = None
+        self.viewport = None
+        self.scene_fbo = 0
+
+    def resize(self, width, height):
+        self.delete_targets()
+        self.accumulation, self.revealage, self.depth = glGenTextures(3)
+        for texture, internal, fmt, kind in ((self.accumulation, GL_RGBA16F, GL_RGBA, GL_FLOAT),
+                                             (self.revealage, GL_R16F, GL_RED, GL_FLOAT),
+                                             (self.depth, GL_DEPTH_COMPONENT24, GL_DEPTH_COMPONENT, GL_UNSIGNED_INT)):
+            glBindTexture(GL_TEXTURE_2D, texture)
+            glTexImage2D(GL_TEXTURE_2D, 0, internal, width, height, 0, fmt, kind, None)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        self.textures = [self.accumulation, self.revealage, self.depth]
+
+        previous = glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
+        self.fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.accumulation, 0)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT1, GL_TEXTURE_2D, self.revealage, 0)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_TEXTURE_2D, self.depth, 0)
+        complete = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+        glBindFramebuffer(GL_FRAMEBUFFER, previous)
+        if not complete:
+            raise RuntimeError("transparency framebuffer is incomplete")
+        self.size = (width, height)
+
+    def begin(self):
+        x, y, width, height = (int(v) for v in glGetIntegerv(GL_VIEWPORT))
+        if self.size != (width, height):
+            self.resize(width, height)
+        self.viewport = (x, y, width, height)
+        self.scene_fbo = glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
+
+        # transparent fragments are still hidden by the opaque scene: copy its depth
+        glBindTexture(GL_TEXTURE_2D, self.depth)
+        glCopyTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, x, y, width, height)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, width, height)
+        glDrawBuffers(2, [GL_COLOR_ATTACHMENT0, GL_COLOR_ATTACHMENT1])
+        glClearBufferfv(GL_COLOR, 0, np.array([0.0, 0.0, 0.0, 0.0], dtype=np.float32))
+        glClearBufferfv(GL_COLOR, 1, np.array([1.0, 1.0, 1.0, 1.0], dtype=np.float32))
+
+        glDepthMask(GL_FALSE) # Read-only depth buffer
+        glEnable(GL_BLEND)
+        glBlendFunci(0, GL_ONE, GL_ONE)
+        glBlendFunci(1, GL_ZERO, GL_ONE_MINUS_SRC_COLOR)
+
+    def end(self):
+        x, y, width, height = self.viewport
+        glBindFramebuffer(GL_FRAMEBUFFER, self.scene_fbo)
+        glViewport(x, y, width, height)
+        glDepthMask(GL_TRUE)
+
+        glPushAttrib(GL_ENABLE_BIT)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_LIGHTING)
+        glBlendFunc(GL_ONE_MINUS_SRC_ALPHA, GL_SRC_ALPHA)
+
+        glUseProgram(self.composite_program)
+        glUniform4f(glGetUniformLocation(self.composite_program, "viewport"), x, y, width, height)
+        glActiveTexture(GL_TEXTURE1)
+        glBindTexture(GL_TEXTURE_2D, self.revealage)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.accumulation)
+
+        glBegin(GL_QUADS)
+        glVertex2f(-1.0, -1.0); glVertex2f(1.0, -1.0)
+        glVertex2f(1.0, 1.0);   glVertex2f(-1.0, 1.0)
+        glEnd()
+
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glActiveTexture(GL_TEXTURE1)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glActiveTexture(GL_TEXTURE0)
+        glUseProgram(0)
+        glPopAttrib()
+        glDisable(GL_BLEND)
+
+    def delete_targets(self):
+        if self.fbo is not None:
+            glDeleteFramebuffers(1, [self.fbo])
+            glDeleteTextures(len(self.textures), self.textures)
+            self.fbo = None
+            self.textures = []
+            self.size = None
+
+    def delete(self):
+        self.delete_targets()
+        for program in (self.sphere_program, self.object_program, self.composite_program):
+            glDeleteProgram(program)
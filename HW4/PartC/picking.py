@@ -1,4 +1,5 @@
 import math
+import numpy as np
 import pygame
 from OpenGL.GL import *
 from OpenGL.GLU import *
@@ -64,4 +65,52 @@ def ray_sphere_intersect(ray_origin, ray_dir, sphere_center, sphere_radius):
     if t < 0:
         return None # Intersection is behind the camera
         
-    return t
\ No newline at end of file
+    return t
+
+# rays x spheres tested per NumPy pass, bounds the temporary arrays
+BATCH_PAIRS = 1 << 20
+
+def ray_spheres_intersect(ray_origins, ray_dirs, centers, radii):
+    """
+    Vectorized ray_sphere_intersect: the nearest sphere along each ray.
+    ray_origins / ray_dirs are (R, 3) arrays (directions normalized) or a
+    single (3,) ray; centers is (N, 3) and radii is (N,).
+    Returns (index, distance) arrays of length R, with index -1 and
+    distance inf where a ray hits nothing; plain (int, float) for one ray.
+    Spheres with a NaN radius are never hit.
+    """
+    ray_origins = np.asarray(ray_origins, dtype=np.float64)
+    ray_dirs = np.asarray(ray_dirs, dtype=np.float64)
+    single = ray_origins.ndim == 1
+    origins = ray_origins.reshape(-1, 3)
+    dirs = ray_dirs.reshape(-1, 3)
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=np.float64)
+
+    index = np.full(len(origins), -1, dtype=np.int64)
+    distance = np.full(len(origins), np.inf)
+    if len(centers) > 0:
+        chunk = max(1, BATCH_PAIRS // len(centers))
+        for start in range(0, len(origins), chunk):
+            o = origins[start:start + chunk]
+            d = dirs[start:start + chunk]
+
+            # same quadratic as ray_sphere_intersect, for every (ray, sphere) pair
+            f = o[:, None, :] - centers[None, :, :]
+            b = 2.0 * np.einsum("rnk,rk->rn", f, d)
+            c = np.einsum("rnk,rnk->rn", f, f) - radii * radii
+            discriminant = b * b - 4.0 * c
+            with np.errstate(invalid="ignore"):
+                t = (-b - np.sqrt(discriminant)) / 2.0
+                t[~((discriminant >= 0) & (t >= 0))] = np.inf
+
+            # argmin keeps the first sphere on ties, like the scalar loop
+            nearest = np.argmin(t, axis=1)
+            dist = t[np.arange(len(t)), nearest]
+            hit = np.isfinite(dist)
+            index[start:start + chunk][hit] = nearest[hit]
+            distance[start:start + chunk] = dist
+
+    if single:
+        return int(index[0]), float(distance[0])
+    return index, distance
@@ -1,41 +1,478 @@
 import math
+import numpy as np
 from OpenGL.GL import *
-from objects import SphereObject
+from objects import ObjectStore, SphereObject
+from picking import ray_sphere_intersect, ray_spheres_intersect
+from spatial_grid import UniformGrid
+from sphere_batch import SphereInstancer, LOD_MESHES
+from oit import WeightedBlendedOIT
+
+# Level of detail: a coarser sphere_batch.LOD_MESHES level is used once its silhouette
+# error stays below LOD_ERROR_PIXELS on screen, and a sphere has to get LOD_HYSTERESIS
+# past a threshold before it switches (so spheres near a threshold don't pop back and forth)
+LOD_ERROR_PIXELS = 0.5
+LOD_HYSTERESIS = 0.15
+
+# below this many objects the frustum test runs on every sphere at once (NumPy);
+# bigger scenes first walk the grid blocks/cells so only nearby spheres are tested
+GRID_CULL_MIN_OBJECTS = 20000
+
+def lod_thresholds():
+    """Projected radius (pixels) below which each coarser level is good enough."""
+    thresholds = []
+    for slices, stacks in LOD_MESHES[1:]:
+        # chord error of a unit sphere: half a slice around, half a stack up
+        error = max(1.0 - math.cos(math.pi / slices), 1.0 - math.cos(math.pi / (2 * stacks)))
+        thresholds.append(LOD_ERROR_PIXELS / error)
+    return np.array(thresholds)
 
 class Scene:
     def __init__(self):
         self.objects = []
         self.floor_texture = None
+        # spatial index for picking, kept up to date by add_object / move_object / clear
+        self.grid = UniformGrid()
+
+        # the objects' own columnar store (row i = self.objects[i]), used as is for
+        # batch ray tests, drawing and saving; the first `count` rows are live
+        self.store = ObjectStore()
+        self.lod_buffer = np.zeros(16, dtype=np.int8) # current level of detail
+
+        # spheres are drawn with one instanced call per pass; falls back to
+        # SphereObject.draw() per object when instancing is not available
+        self.use_instancing = True
+        self.instancer = None
+        self.lod_counts = [] # instanced spheres per level in the last frame
+        self.visible_count = 0 # objects left after frustum culling in the last frame
+
+        # transparent objects: sorted back-to-front and alpha blended, or (use_oit)
+        # weighted blended order-independent transparency, which needs no sort and
+        # handles intersecting objects; falls back to sorting without OpenGL 4
+        self.use_oit = False
+        self.oit = None
+
+        # partitions of the rows, rebuilt from the alpha column (update_partitions)
+        # once per frame at most, after objects came, went or changed alpha.
+        # transp_rows is kept in back-to-front order by update_order
+        self.opaque_rows = np.zeros(0, dtype=np.int64)
+        self.transp_rows = np.zeros(0, dtype=np.int64)
+        self.partitions_dirty = False
+        self.order_camera = None
+        self.order_dirty = False
+        self.non_spheres = []
+        self.selected = None
+
+        # bumped by every change to the objects; draw() redoes its per-view work
+        # only when this, the camera or the projection changed
+        self.version = 0
+        self.last_view = None
+        self.visible = np.zeros(0, dtype=bool)
+        self.opaque_runs = []
+        self.transp_runs = []
+
+        # autosave journal (journal.SceneJournal) that edits are recorded to, if any
+        self.journal = None
+
+    @property
+    def count(self):
+        return self.store.count
+
+    @property
+    def positions(self):
+        return self.store.pos[:self.count]
+
+    @property
+    def radii(self):
+        return self.store.radius[:self.count]
+
+    @property
+    def colors(self):
+        return self.store.color[:self.count]
+
+    @property
+    def materials(self):
+        return self.store.material[:self.count]
+
+    @property
+    def lods(self):
+        return self.lod_buffer[:self.count]
+
+    def grow_lods(self):
+        while len(self.lod_buffer) < len(self.store.radius):
+            self.lod_buffer = np.concatenate([self.lod_buffer, np.zeros_like(self.lod_buffer)])
 
     def add_object(self, obj):
+        # move the object's values into the scene's store; obj.row is its index from now on
+        row = obj.attach(self.store)
         self.objects.append(obj)
+        if isinstance(obj, SphereObject):
+            self.grid.insert(obj, row)
+        # (objects that are not spheres keep a NaN radius: never hit by a ray nor instanced)
+        self.grow_lods()
+        self.lod_buffer[row] = 0
+
+        self.partitions_dirty = True
+        if not isinstance(obj, SphereObject):
+            self.non_spheres.append(obj)
+        if self.journal:
+            self.journal.record_add(row, obj)
+        self.version += 1
+
+    def add_spheres(self, positions, radii, colors, materials):
+        """
+        Bulk add_object for many spheres given as columns ((N, 3), (N,), (N, 4),
+        (N, 2) specular/shininess), e.g. straight from a binary scene file:
+        the columns are copied into the store whole, each sphere only gets a
+        handle onto its row, and the grid takes them all in one insert_many.
+        No GL calls, so a loader thread can build a scene with it (take_objects).
+        """
+        n = len(radii)
+        first = self.store.extend(n)
+        rows = slice(first, first + n)
+        self.store.pos[rows] = positions
+        self.store.radius[rows] = radii
+        self.store.color[rows] = colors
+        self.store.material[rows] = materials
+        self.grow_lods()
+        self.lod_buffer[rows] = 0
+
+        objs = [SphereObject.view(self.store, row) for row in range(first, first + n)]
+        self.objects.extend(objs)
+        self.grid.insert_many(objs, range(first, first + n), self.store.pos[rows], self.store.radius[rows])
+
+        self.partitions_dirty = True
+        self.version += 1
+        if self.journal:
+            self.journal.record_bulk_change()
+
+    def clear(self):
+        for obj in self.objects:
+            obj.release()
+        # the old objects' rows get reused: they must not be used after this
+        self.objects = []
+        self.grid.clear()
+        self.store.clear()
+        self.opaque_rows = np.zeros(0, dtype=np.int64)
+        self.transp_rows = np.zeros(0, dtype=np.int64)
+        self.partitions_dirty = False
+        self.non_spheres = []
+        self.select(None)
+        self.version += 1
+        if self.journal:
+            self.journal.record_bulk_change()
+
+    def take_objects(self, other):
+        """
+        Replace this scene's objects with other's, e.g. a scene a loader
+        thread has built with add_spheres: the store, handles and grid are
+        taken over as they are, so this costs no more than clear().
+        """
+        self.clear()
+        self.store, self.objects, self.grid = other.store, other.objects, other.grid
+        self.lod_buffer = other.lod_buffer
+        self.non_spheres = other.non_spheres
+        self.partitions_dirty = True
+
+    def select(self, obj):
+        """Make obj (or None) the one selected object."""
+        if self.selected is not None:
+            self.selected.selected = False
+        self.selected = obj
+        if obj is not None:
+            obj.selected = True
+
+    def set_color(self, obj, r, g, b, a=1.0):
+        """Change an object's color; an alpha change moves it between the opaque and transparent passes."""
+        was_transparent = obj.is_transparent()
+        row = obj.row
+        self.store.color[row] = (r, g, b, a)
+        if obj.is_transparent() != was_transparent:
+            self.partitions_dirty = True
+        self.version += 1
+        if self.journal:
+            self.journal.record_set("color", row, obj.color)
+
+    def update_partitions(self):
+        """
+        Rebuild opaque_rows / transp_rows from the alpha column if objects came
+        or changed alpha since the last call; O(objects), however many changes.
+        Rows that stay transparent keep their back-to-front order, new ones go
+        to the end for the next update_order.
+        """
+        if not self.partitions_dirty:
+            return
+        transparent = self.colors[:, 3] < 1.0
+        self.opaque_rows = np.flatnonzero(~transparent) # in scene order
+        kept = self.transp_rows[transparent[self.transp_rows]]
+        added = transparent.copy()
+        added[kept] = False
+        self.transp_rows = np.concatenate([kept, np.flatnonzero(added)])
+        if added.any():
+            self.order_dirty = True
+        self.partitions_dirty = False
+
+    def move_object(self, obj, dx, dy, dz):
+        self.store.pos[obj.row] += (dx, dy, dz)
+        if isinstance(obj, SphereObject):
+            self.grid.update(obj)
+        if obj.is_transparent():
+            self.order_dirty = True
+        self.version += 1
+        if self.journal:
+            self.journal.record_set("pos", obj.row, obj.pos)
+
+    def intersect(self, ray_origins, ray_dirs):
+        """
+        Batch ray test against every sphere at once, through the NumPy mirror.
+        One (3,) ray gives (object index, distance), with (-1, inf) for a
+        miss; (R, 3) rays (e.g. a marquee selection) give two length-R arrays.
+        Indices refer to self.objects.
+        """
+        return ray_spheres_intersect(ray_origins, ray_dirs, self.positions, self.radii)
+
+    def pick(self, ray_origin, ray_dir):
+        """
+        Nearest sphere hit by the ray, or None.
+        Walks the grid cells along the ray and stops at the first cell
+        whose far side is beyond the closest hit found so far.
+        """
+        closest_dist = float('inf')
+        hit_obj = None
+        tested = set()
+
+        for cell, t_exit in self.grid.ray_cells(ray_origin, ray_dir):
+            for obj in self.grid.cells.get(cell, ()):
+                if obj in tested:
+                    continue
+                tested.add(obj)
+                dist = ray_sphere_intersect(ray_origin, ray_dir, obj.pos, obj.radius)
+                if dist is not None and dist < closest_dist:
+                    closest_dist = dist
+                    hit_obj = obj
+            if closest_dist <= t_exit:
+                break
+
+        return hit_obj
+
+    def frustum_planes(self):
+        """
+        The 6 planes (a, b, c, d; inside where ax + by + cz + d >= 0, normals unit length)
+        of the current projection * modelview, i.e. the view frustum in world space.
+        """
+        # GL matrices come back column-major, so these are the transposes
+        modelview = np.array(glGetDoublev(GL_MODELVIEW_MATRIX)).reshape(4, 4)
+        projection = np.array(glGetDoublev(GL_PROJECTION_MATRIX)).reshape(4, 4)
+        clip = (modelview @ projection).T
+
+        planes = np.array([clip[3] + clip[0], clip[3] - clip[0],   # left, right
+                           clip[3] + clip[1], clip[3] - clip[1],   # bottom, top
+                           clip[3] + clip[2], clip[3] - clip[2]])  # near, far
+        return planes / np.linalg.norm(planes[:, :3], axis=1)[:, None]
+
+    def visible_mask(self, planes):
+        """Per object: True unless its bounding sphere is entirely outside the planes."""
+        if self.count < GRID_CULL_MIN_OBJECTS:
+            candidates = slice(0, self.count)
+        else:
+            # objects that are not spheres are not in the grid
+            candidates = np.concatenate([self.grid.frustum_items(planes), np.flatnonzero(np.isnan(self.radii))])
+
+        # signed distance of every bounding sphere to every plane, one plane per row;
+        # objects that are not spheres have no bounds (NaN radius) and are never culled
+        dist = planes[:, :3] @ self.positions[candidates].T
+        dist += planes[:, 3:]
+        dist += self.radii[candidates]
+        outside = dist[0] < 0.0
+        for plane_dist in dist[1:]:
+            outside |= plane_dist < 0.0
+        mask = np.zeros(self.count, dtype=bool)
+        mask[candidates] = ~outside
+        return mask
+
+    def update_lods(self, camera_pos, dist):
+        """
+        Pick every sphere's level of detail from its projected radius in pixels.
+        A sphere only moves to a coarser level once it is LOD_HYSTERESIS below
+        a threshold, and back to a finer one once it is LOD_HYSTERESIS above it.
+        """
+        # pixels per unit at distance 1: half the viewport height * cot(fovy / 2)
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        projection = glGetDoublev(GL_PROJECTION_MATRIX)
+        pixels = 0.5 * viewport[3] * projection[1][1]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            size = np.where(dist > self.radii, self.radii * pixels / dist, np.inf)
+        thresholds = lod_thresholds()
+        coarsest = (size[:, None] < thresholds * (1.0 - LOD_HYSTERESIS)).sum(axis=1)
+        finest = (size[:, None] < thresholds * (1.0 + LOD_HYSTERESIS)).sum(axis=1)
+        self.lods[:] = np.clip(self.lods, coarsest, finest)
 
     def draw(self, camera_pos):
+        if self.use_instancing and self.instancer is None:
+            try:
+                self.instancer = SphereInstancer()
+            except Exception as e:
+                print(f"Instanced spheres unavailable ({e}), drawing them one by one.")
+                self.use_instancing = False
+        if self.use_oit and self.oit is None:
+            try:
+                self.oit = WeightedBlendedOIT()
+            except Exception as e:
+                print(f"Order-independent transparency unavailable ({e}), sorting instead.")
+                self.use_oit = False
+
+        # culling, ordering, levels of detail and the instance upload only depend on
+        # the view and the scene, so a static view just replays the last frame's draws
+        planes = self.frustum_planes()
+        view = (self.version, self.use_oit, tuple(camera_pos), planes.tobytes(), tuple(glGetIntegerv(GL_VIEWPORT)))
+        if view != self.last_view:
+            self.last_view = view
+            self.update_partitions()
+            self.visible = self.visible_mask(planes)
+            self.visible_count = int(self.visible.sum())
+            if not self.use_oit:
+                self.update_order(camera_pos)
+            if self.use_instancing:
+                self.prepare_instances(camera_pos)
+
+        if self.use_instancing:
+            self.draw_instanced()
+        else:
+            self.draw_objects()
+
+    def update_order(self, camera_pos):
+        """
+        Re-sort the transparent rows back-to-front (distance from camera to
+        object center, descending) after the camera or a transparent object moved.
+        The rows stay in last frame's order, which is nearly sorted for small
+        moves, and NumPy's stable sort (a natural merge sort) runs in close to
+        linear time on nearly sorted input; ties keep their previous order.
+        """
+        camera = tuple(camera_pos)
+        if not self.order_dirty and camera == self.order_camera:
+            return
+        p = self.positions[self.transp_rows]
+        d = (camera[0] - p[:, 0])**2 + (camera[1] - p[:, 1])**2 + (camera[2] - p[:, 2])**2
+        self.transp_rows = self.transp_rows[np.argsort(-d, kind="stable")]
+        self.order_camera = camera
+        self.order_dirty = False
+
+    def prepare_instances(self, camera_pos):
+        """Upload this view's instance rows and plan the instanced draw calls."""
+        p = self.positions
+        d = (camera_pos[0] - p[:, 0])**2 + (camera_pos[1] - p[:, 1])**2 + (camera_pos[2] - p[:, 2])**2
+        self.update_lods(camera_pos, np.sqrt(d))
+        lods = self.lods
+
+        drawn = ~np.isnan(self.radii) & self.visible
+        # opaque spheres grouped by level of detail: one draw call per level
+        opaque_rows = self.opaque_rows[drawn[self.opaque_rows]]
+        opaque_rows = opaque_rows[np.argsort(lods[opaque_rows], kind="stable")]
+        # transparent ones keep the back-to-front order, unless their order doesn't matter
+        transp_rows = self.transp_rows[drawn[self.transp_rows]]
+        if self.use_oit:
+            transp_rows = transp_rows[np.argsort(lods[transp_rows], kind="stable")]
+
+        rows = np.concatenate([opaque_rows, transp_rows])
+        self.instancer.upload(np.hstack([self.positions[rows], self.radii[rows, None],
+                                         self.colors[rows], self.materials[rows]]))
+        self.lod_counts = np.bincount(lods[rows], minlength=len(self.instancer.levels)).tolist()
+        self.opaque_runs = self.level_runs(0, lods[opaque_rows])
+        self.transp_runs = self.level_runs(len(opaque_rows), lods[transp_rows])
+
+    def level_runs(self, first, levels):
+        """
+        (first row, count, level) instanced draws for the uploaded rows
+        [first, first + len(levels)), in order: one per run of consecutive
+        rows that share a level of detail.
+        """
+        if len(levels) == 0:
+            return []
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(levels)) + 1, [len(levels)]])
+        return [(first + a, b - a, int(levels[a])) for a, b in zip(starts[:-1].tolist(), starts[1:].tolist())]
+
+    def draw_instanced(self):
+        """Same passes as draw_objects, but every sphere pass is one instanced draw call per level."""
+        selected = self.selected
+        if selected is not None and not self.visible[selected.row]:
+            selected = None
+
+        # 1. Opaque Objects
+        for first, count, level in self.opaque_runs:
+            self.instancer.draw(first, count, level)
+        for obj in self.non_spheres:
+            if not obj.is_transparent() and self.visible[obj.row]:
+                obj.draw()
+        if selected is not None and not selected.is_transparent():
+            selected.draw_selection()
+
+        # 2. Floor (Opaque)
+        if self.floor_texture:
+            self.draw_floor()
+
+        # 3. Transparent Objects, already sorted (or order independent)
+        transparent = [obj for obj in self.non_spheres if obj.is_transparent() and self.visible[obj.row]]
+        if self.use_oit:
+            self.oit.begin()
+            for first, count, level in self.transp_runs:
+                self.instancer.draw(first, count, level, self.oit.sphere_program)
+            self.draw_oit_objects(transparent)
+            self.oit.end()
+        else:
+            glEnable(GL_BLEND)
+            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+            glDepthMask(GL_FALSE) # Read-only depth buffer
+
+            for first, count, level in self.transp_runs:
+                self.instancer.draw(first, count, level)
+            for obj in transparent:
+                obj.draw()
+
+            glDepthMask(GL_TRUE)
+            glDisable(GL_BLEND)
+
+        if selected is not None and selected.is_transparent():
+            selected.draw_selection()
+
+    def draw_objects(self):
         # 1. Draw Opaque Objects First
-        opaque_objs = [o for o in self.objects if not o.is_transparent()]
-        for obj in opaque_objs:
-            obj.draw()
+        for i in self.opaque_rows[self.visible[self.opaque_rows]].tolist():
+            self.objects[i].draw()
 
         # 2. Draw Floor (Opaque)
         if self.floor_texture:
             self.draw_floor()
 
-        # 3. Sort and Draw Transparent Objects (Back-to-Front)
-        transp_objs = [o for o in self.objects if o.is_transparent()]
-        
-        # Sort key: Distance from camera to object center (descending)
-        transp_objs.sort(key=lambda o: self.dist_sq(camera_pos, o.pos), reverse=True)
+        # 3. Draw Transparent Objects (Back-to-Front, kept sorted by update_order)
+        transparent = [self.objects[i] for i in self.transp_rows[self.visible[self.transp_rows]].tolist()]
+        if self.use_oit:
+            # any order; the selection cue goes on top afterwards
+            self.oit.begin()
+            self.draw_oit_objects(transparent)
+            self.oit.end()
+            if self.selected in transparent:
+                self.selected.draw_selection()
+        else:
+            # Enable blending and disable depth writing for transparency
+            glEnable(GL_BLEND)
+            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+            glDepthMask(GL_FALSE) # Read-only depth buffer
 
-        # Enable blending and disable depth writing for transparency
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        glDepthMask(GL_FALSE) # Read-only depth buffer
+            for obj in transparent:
+                obj.draw()
 
-        for obj in transp_objs:
-            obj.draw()
+            glDepthMask(GL_TRUE)
+            glDisable(GL_BLEND)
 
-        glDepthMask(GL_TRUE)
-        glDisable(GL_BLEND)
+    def draw_oit_objects(self, objects):
+        """Fixed-function objects into the order-independent transparency targets (selection cues come after)."""
+        glUseProgram(self.oit.object_program)
+        for obj in objects:
+            if isinstance(obj, SphereObject):
+                obj.draw_shape()
+            else:
+                obj.draw()
+        glUseProgram(0)
 
     def draw_floor(self):
         glEnable(GL_TEXTURE_2D)
@@ -0,0 +1,232 @@
+import math
+import numpy as np
+
+# cells per block edge: occupied cells are also grouped into blocks of BLOCK^3
+# cells, the coarse level that frustum culling tests first
+BLOCK = 8
+
+class UniformGrid:
+    """
+    Hashed uniform grid over the spheres of a scene.
+    Every object is stored in each cell its bounding box touches, so
+    moving it only touches the handful of cells it leaves and enters.
+    Occupied cells are grouped into blocks, a second, coarser level.
+    """
+
+    def __init__(self, cell_size=2.0):
+        self.cell_size = cell_size
+        self.cells = {}        # (i, j, k) -> set of objects
+        self.blocks = {}       # block (cell // BLOCK) -> set of occupied cells in it
+        self.obj_range = {}    # object -> (lo cell, hi cell) it is stored in
+        self.obj_item = {}     # object -> the int it was inserted with (e.g. its scene row)
+        # block -> int array of the items in it, rebuilt lazily after the block changed
+        self.block_items = {}
+        self.block_keys = None # (B, 3) array of self.blocks keys, None after blocks came or went
+        # cells ever used; only grows, so a ray is clipped to a box that covers every object
+        self.lo_cell = None
+        self.hi_cell = None
+
+    def cell_range(self, obj):
+        r = float(obj.radius)
+        p = obj.pos.tolist() # plain floats: much faster than indexing the store's row
+        lo = tuple(math.floor((p[a] - r) / self.cell_size) for a in range(3))
+        hi = tuple(math.floor((p[a] + r) / self.cell_size) for a in range(3))
+        return lo, hi
+
+    def cells_in(self, lo, hi):
+        for i in range(lo[0], hi[0] + 1):
+            for j in range(lo[1], hi[1] + 1):
+                for k in range(lo[2], hi[2] + 1):
+                    yield (i, j, k)
+
+    def insert(self, obj, item=-1):
+        lo, hi = self.cell_range(obj)
+        for key in self.cells_in(lo, hi):
+            if key not in self.cells:
+                self.cells[key] = set()
+                block = self.block_of(key)
+                if block not in self.blocks:
+                    self.blocks[block] = set()
+                    self.block_keys = None
+                self.blocks[block].add(key)
+            self.cells[key].add(obj)
+            self.block_items.pop(self.block_of(key), None)
+        self.obj_range[obj] = (lo, hi)
+        self.obj_item[obj] = item
+
+        if self.lo_cell is None:
+            self.lo_cell, self.hi_cell = lo, hi
+        else:
+            self.lo_cell = tuple(min(a, b) for a, b in zip(self.lo_cell, lo))
+            self.hi_cell = tuple(max(a, b) for a, b in zip(self.hi_cell, hi))
+
+    def insert_many(self, objs, items, positions, radii):
+        """
+        insert() for many objects at once, given their (N, 3) positions and
+        (N,) radii: the cells of all objects are worked out with NumPy, and
+        each touched cell is then updated once with all of its objects.
+        """
+        n = len(objs)
+        if n == 0:
+            return
+        lo = np.floor((positions - radii[:, None]) / self.cell_size).astype(np.int64)
+        hi = np.floor((positions + radii[:, None]) / self.cell_size).astype(np.int64)
+
+        # one (object, cell) pair per cell each object's box touches
+        span = hi - lo + 1
+        per_obj = span.prod(axis=1)
+        owner = np.repeat(np.arange(n), per_obj)
+        k = np.arange(len(owner)) - np.repeat(np.cumsum(per_obj) - per_obj, per_obj)
+        sj, sk = span[owner, 1], span[owner, 2]
+        pairs = lo[owner] + np.stack([k // (sj * sk), k // sk % sj, k % sk], axis=1)
+
+        # sorted by cell (packed into one int64, which sorts far faster than rows):
+        # the objects of the i-th cell are members[bounds[i]:bounds[i + 1]]
+        origin = pairs.min(axis=0)
+        code = np.ravel_multi_index((pairs - origin).T, pairs.max(axis=0) - origin + 1)
+        order = np.argsort(code, kind="stable")
+        code = code[order]
+        starts = np.flatnonzero(np.concatenate([[True], code[1:] != code[:-1]]))
+        keys = pairs[order[starts]]
+        members = np.empty(n, dtype=object)
+        members[:] = objs
+        members = members[owner[order]].tolist()
+        bounds = starts.tolist() + [len(order)]
+
+        blocks = map(tuple, (keys // BLOCK).tolist())
+        for i, (key, block) in enumerate(zip(map(tuple, keys.tolist()), blocks)):
+            cell = self.cells.get(key)
+            if cell is None:
+                cell = self.cells[key] = set()
+                if block not in self.blocks:
+                    self.blocks[block] = set()
+                    self.block_keys = None
+                self.blocks[block].add(key)
+            cell.update(members[bounds[i]:bounds[i + 1]])
+            self.block_items.pop(block, None)
+        self.obj_range.update(zip(objs, zip(map(tuple, lo.tolist()), map(tuple, hi.tolist()))))
+        self.obj_item.update(zip(objs, items))
+
+        lo, hi = tuple(lo.min(axis=0).tolist()), tuple(hi.max(axis=0).tolist())
+        if self.lo_cell is None:
+            self.lo_cell, self.hi_cell = lo, hi
+        else:
+            self.lo_cell = tuple(min(a, b) for a, b in zip(self.lo_cell, lo))
+            self.hi_cell = tuple(max(a, b) for a, b in zip(self.hi_cell, hi))
+
+    def remove(self, obj):
+        lo, hi = self.obj_range.pop(obj)
+        self.obj_item.pop(obj)
+        for key in self.cells_in(lo, hi):
+            cell = self.cells[key]
+            cell.discard(obj)
+            self.block_items.pop(self.block_of(key), None)
+            if not cell:
+                del self.cells[key]
+                block = self.blocks[self.block_of(key)]
+                block.discard(key)
+                if not block:
+                    del self.blocks[self.block_of(key)]
+                    self.block_keys = None
+
+    def update(self, obj):
+        """Call after obj.pos (or obj.radius) changed."""
+        if self.cell_range(obj) == self.obj_range[obj]:
+            return
+        item = self.obj_item[obj]
+        self.remove(obj)
+        self.insert(obj, item)
+
+    def block_of(self, key):
+        return (key[0] // BLOCK, key[1] // BLOCK, key[2] // BLOCK)
+
+    def clear(self):
+        self.cells.clear()
+        self.blocks.clear()
+        self.obj_range.clear()
+        self.obj_item.clear()
+        self.block_items.clear()
+        self.block_keys = None
+        self.lo_cell = None
+        self.hi_cell = None
+
+    def ray_cells(self, ray_origin, ray_dir):
+        """
+        Yields (cell key, t where the ray leaves the cell) for every cell the
+        ray passes through inside the grid bounds, front to back (3D-DDA).
+        """
+        if self.lo_cell is None:
+            return
+        cs = self.cell_size
+
+        # clip the ray to the grid bounds (slab test)
+        t_enter, t_leave = 0.0, math.inf
+        for a in range(3):
+            lo = self.lo_cell[a] * cs
+            hi = (self.hi_cell[a] + 1) * cs
+            if ray_dir[a] == 0.0:
+                if ray_origin[a] < lo or ray_origin[a] > hi:
+                    return
+                continue
+            t0 = (lo - ray_origin[a]) / ray_dir[a]
+            t1 = (hi - ray_origin[a]) / ray_dir[a]
+            if t0 > t1:
+                t0, t1 = t1, t0
+            t_enter = max(t_enter, t0)
+            t_leave = min(t_leave, t1)
+        if t_enter > t_leave:
+            return
+
+        cell, step, t_next, t_delta = [0] * 3, [0] * 3, [math.inf] * 3, [math.inf] * 3
+        for a in range(3):
+            p = ray_origin[a] + ray_dir[a] * t_enter
+            c = math.floor(p / cs)
+            cell[a] = min(max(c, self.lo_cell[a]), self.hi_cell[a])
+            if ray_dir[a] > 0.0:
+                step[a] = 1
+                t_next[a] = ((cell[a] + 1) * cs - ray_origin[a]) / ray_dir[a]
+                t_delta[a] = cs / ray_dir[a]
+            elif ray_dir[a] < 0.0:
+                step[a] = -1
+                t_next[a] = (cell[a] * cs - ray_origin[a]) / ray_dir[a]
+                t_delta[a] = -cs / ray_dir[a]
+
+        while True:
+            a = min(range(3), key=t_next.__getitem__)
+            yield tuple(cell), t_next[a]
+            if t_next[a] > t_leave:
+                return
+            cell[a] += step[a]
+            if cell[a] < self.lo_cell[a] or cell[a] > self.hi_cell[a]:
+                return
+            t_next[a] += t_delta[a]
+
+    def items_in_block(self, block):
+        items = self.block_items.get(block)
+        if items is None:
+            members = set()
+            for key in self.blocks[block]:
+                members.update(self.cells[key])
+            items = np.array([self.obj_item[o] for o in members], dtype=np.int64)
+            self.block_items[block] = items
+        return items
+
+    def frustum_items(self, planes):
+        """
+        Items (see insert) of every object in a block that is not entirely
+        outside the planes (rows a, b, c, d, unit normals), e.g. the view
+        frustum. All blocks are tested at once through their bounding spheres,
+        so the cost grows with the number of blocks and of the objects near
+        the frustum, not with the whole scene; the caller still tests the
+        objects themselves. An object that spans blocks can be listed twice.
+        """
+        if self.block_keys is None:
+            self.block_keys = np.array(list(self.blocks), dtype=np.float64).reshape(-1, 3)
+        bs = self.cell_size * BLOCK
+        centers = (self.block_keys + 0.5) * bs
+        dist = planes[:, :3] @ centers.T + planes[:, 3:] + bs * math.sqrt(3.0) * 0.5
+        inside = np.all(dist >= 0.0, axis=0)
+
+        keys = self.block_keys[inside].astype(np.int64).tolist()
+        items = [self.items_in_block(tuple(key)) for key in keys]
+        return np.concatenate(items) if items else np.zeros(0, dtype=np.int64)
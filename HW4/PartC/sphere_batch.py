@@ -0,0 +1,195 @@
+import math
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+from resources import pool
+
+# Per-vertex lighting of the fixed-function pipeline (GL_LIGHT0, GL_COLOR_MATERIAL
+# on ambient + diffuse, infinite viewer), so instanced spheres shade like gluSphere ones.
+VERTEX_SHADER = """
+#version 120
+attribute vec3 vertex;          // unit sphere: position == normal
+attribute vec4 center_radius;   // per instance
+attribute vec4 color;           // per instance
+attribute vec2 material;        // per instance: specular, shininess
+
+void main()
+{
+    vec4 eye = gl_ModelViewMatrix * vec4(center_radius.xyz + vertex * center_radius.w, 1.0);
+    gl_Position = gl_ProjectionMatrix * eye;
+
+    vec3 n = normalize(gl_NormalMatrix * vertex);
+    vec4 lp = gl_LightSource[0].position;
+    vec3 l = lp.xyz - eye.xyz * lp.w;
+    float d = length(l);
+    l /= d;
+    float attenuation = lp.w == 0.0 ? 1.0 : 1.0 / (gl_LightSource[0].constantAttenuation
+        + gl_LightSource[0].linearAttenuation * d + gl_LightSource[0].quadraticAttenuation * d * d);
+
+    float n_dot_l = max(dot(n, l), 0.0);
+    float highlight = 0.0;
+    if (n_dot_l > 0.0)
+        highlight = pow(max(dot(n, normalize(l + vec3(0.0, 0.0, 1.0))), 0.0), material.y);
+
+    vec3 c = gl_LightModel.ambient.rgb * color.rgb
+           + attenuation * (gl_LightSource[0].ambient.rgb * color.rgb
+                            + n_dot_l * gl_LightSource[0].diffuse.rgb * color.rgb
+                            + highlight * gl_LightSource[0].specular.rgb * material.x);
+    gl_FrontColor = vec4(clamp(c, 0.0, 1.0), color.a);
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 120
+void main()
+{
+    gl_FragColor = gl_Color;
+}
+"""
+
+ATTRIBUTES = {"vertex": 0, "center_radius": 1, "color": 2, "material": 3}
+
+# instance row: center xyz, radius, color rgba, specular, shininess
+INSTANCE_FLOATS = 10
+
+# (slices, stacks) of every level of detail, finest (the old gluSphere 32x32) first
+LOD_MESHES = ((32, 32), (16, 16), (8, 8), (6, 4))
+
+
+def sphere_mesh(slices=32, stacks=32):
+    """Unit sphere with the tessellation of gluSphere(quad, 1, slices, stacks): z is the pole axis."""
+    rho = np.linspace(0.0, math.pi, stacks + 1)
+    theta = np.linspace(0.0, 2.0 * math.pi, slices + 1)
+    r, t = np.meshgrid(rho, theta, indexing="ij")
+    vertices = np.stack([np.sin(r) * np.sin(t), np.sin(r) * np.cos(t), np.cos(r)], axis=-1)
+
+    # top to bottom, one band of quads (two triangles) per stack, wound outwards
+    j, i = np.meshgrid(np.arange(stacks), np.arange(slices), indexing="ij")
+    a = j * (slices + 1) + i
+    b = a + slices + 1
+    quads = np.stack([a, b, a + 1, a + 1, b, b + 1], axis=-1).reshape(stacks, slices * 6)
+    # the pole rows are single triangles (gluSphere draws them as fans)
+    top = quads[0].reshape(-1, 6)[:, 3:]
+    bottom = quads[-1].reshape(-1, 6)[:, :3]
+    indices = np.concatenate([top.ravel(), quads[1:-1].ravel(), bottom.ravel()])
+
+    return vertices.reshape(-1, 3).astype(np.float32), indices.astype(np.uint32)
+
+
+def compile_program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER):
+    """Link a program from GLSL sources; a None stage keeps the fixed-function one."""
+    program = glCreateProgram()
+    for source, kind in ((vertex_shader, GL_VERTEX_SHADER), (fragment_shader, GL_FRAGMENT_SHADER)):
+        if source is None:
+            continue
+        shader = glCreateShader(kind)
+        glShaderSource(shader, source)
+        glCompileShader(shader)
+        if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+            raise RuntimeError(glGetShaderInfoLog(shader).decode())
+        glAttachShader(program, shader)
+        glDeleteShader(shader)
+    for name, location in ATTRIBUTES.items():
+        glBindAttribLocation(program, location, name)
+    glLinkProgram(program)
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        raise RuntimeError(glGetProgramInfoLog(program).decode())
+    return program
+
+
+def build_lod_buffers(lod_meshes):
+    """
+    Every level in one vertex / index buffer: (vbo, ibo, levels) with
+    levels[i] = (byte offset, index count) of lod_meshes[i].
+    """
+    all_vertices, all_indices = [], []
+    levels = []
+    vertex_base = index_base = 0
+    for slices, stacks in lod_meshes:
+        vertices, indices = sphere_mesh(slices, stacks)
+        all_vertices.append(vertices)
+        all_indices.append(indices + vertex_base)
+        levels.append((index_base * 4, len(indices)))
+        vertex_base += len(vertices)
+        index_base += len(indices)
+    vertices = np.concatenate(all_vertices)
+    indices = np.concatenate(all_indices)
+
+    vbo, ibo = glGenBuffers(2)
+    glBindBuffer(GL_ARRAY_BUFFER, vbo)
+    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ibo)
+    glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    return vbo, ibo, levels
+
+def delete_lod_buffers(mesh):
+    glDeleteBuffers(2, list(mesh[:2]))
+
+
+class SphereInstancer:
+    """
+    Draws many spheres from shared unit-sphere meshes (one per level of
+    detail in LOD_MESHES) with one instanced draw call per pass and level.
+    Instance rows (see INSTANCE_FLOATS) are uploaded once per frame with
+    upload(); draw(first, count, level) then renders rows [first, first + count)
+    in order, so blended passes keep their sorting.
+    Needs a GL context and OpenGL 3.3 (instanced arrays); raises otherwise.
+    """
+
+    def __init__(self, lod_meshes=LOD_MESHES):
+        if not bool(glDrawElementsInstanced) or not bool(glVertexAttribDivisor):
+            raise RuntimeError("instanced drawing is not supported")
+        self.program = compile_program()
+
+        # the meshes are shared by every instancer with the same levels
+        self.mesh_key = ("sphere_lods", tuple(lod_meshes))
+        self.vbo, self.ibo, self.levels = pool.acquire(self.mesh_key, lambda: build_lod_buffers(lod_meshes), delete_lod_buffers)
+        self.instance_vbo = glGenBuffers(1)
+
+    def upload(self, instances):
+        """instances: (N, INSTANCE_FLOATS) float32 rows for this frame."""
+        instances = np.ascontiguousarray(instances, dtype=np.float32)
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        # a fresh store every frame, so the driver never waits on last frame's draws
+        glBufferData(GL_ARRAY_BUFFER, max(instances.nbytes, 4), instances if len(instances) else None, GL_STREAM_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def triangles(self, level):
+        return self.levels[level][1] // 3
+
+    def draw(self, first, count, level=0, program=None):
+        """program: one linked from VERTEX_SHADER with another fragment shader (default: self.program)."""
+        if count == 0:
+            return
+        glUseProgram(program or self.program)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableVertexAttribArray(ATTRIBUTES["vertex"])
+        glVertexAttribPointer(ATTRIBUTES["vertex"], 3, GL_FLOAT, GL_FALSE, 0, None)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        stride = INSTANCE_FLOATS * 4
+        base = first * stride
+        for name, size, offset in (("center_radius", 4, 0), ("color", 4, 4), ("material", 2, 8)):
+            location = ATTRIBUTES[name]
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, size, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(base + offset * 4))
+            glVertexAttribDivisor(location, 1)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        offset, index_count = self.levels[level]
+        glDrawElementsInstanced(GL_TRIANGLES, index_count, GL_UNSIGNED_INT, ctypes.c_void_p(offset), count)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+        for location in ATTRIBUTES.values():
+            glVertexAttribDivisor(location, 0)
+            glDisableVertexAttribArray(location)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glUseProgram(0)
+
+    def delete(self):
+        pool.release(self.mesh_key)
+        glDeleteBuffers(1, [self.instance_vbo])
+        glDeleteProgram(self.program)
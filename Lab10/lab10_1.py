@@ -1,14 +1,14 @@
-import os
 import math
 import pygame
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")) # headless, mesh_cache, textures, ...: one copy for every lab
+import headless  # before OpenGL: selects the offscreen GL platform for --headless runs
 from OpenGL.GL import *
 from OpenGL.GLU import *
-
-# Pillow (PIL) for loading textures
-try:
-    from PIL import Image
-except ImportError:
-    raise SystemExit("Missing Pillow. Install with: python -m pip install Pillow")
+from profiler import FrameProfiler, FrameHud
+from text_atlas import glyph_atlas, TextBatch, delete_atlases
+from textures import load_texture, release_texture
 
 # -------------------------
 # Config
@@ -33,6 +33,11 @@ zooming = False
 # Light
 light_pos = [0.0, 6.0, 2.0, 1.0]
 
+# Frame-time profiler (F3: show HUD, F4: write CSV/JSON traces)
+profiler = FrameProfiler(gl_timer=True)
+hud = None
+show_hud = False
+
 
 # -------------------------
 # Small math helpers
@@ -59,74 +64,9 @@ def cross(a, b):
 # -------------------------
 # Texture loading
 # -------------------------
-def load_texture(path: str, use_alpha=False) -> int:
-    """Load an image as an OpenGL texture."""
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Texture not found: {path}")
-
-    tex = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, tex)
-
-    img = Image.open(path)
-    
-    # Check if we need transparency
-    if use_alpha or img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-        img = img.convert("RGBA")
-        mode = GL_RGBA
-    else:
-        img = img.convert("RGB")
-        mode = GL_RGB
-    
-    img = img.transpose(Image.FLIP_TOP_BOTTOM)
-    data = img.tobytes()
-
-    glTexImage2D(
-        GL_TEXTURE_2D, 0, mode,
-        img.width, img.height, 0,
-        mode, GL_UNSIGNED_BYTE, data
-    )
-
-    # Generate mipmaps for better quality
-    glGenerateMipmap(GL_TEXTURE_2D)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-
-    # Set wrapping mode
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-
-    glBindTexture(GL_TEXTURE_2D, 0)
-    return tex
-
-
 # -------------------------
-# OpenGL overlay text (PyGame font -> GL texture)
+# 2D overlay (text comes from text_atlas.py)
 # -------------------------
-def create_text_texture(font, text, color=(255, 255, 255), bg=(0, 0, 0, 180)):
-    """
-    Render text to a PyGame RGBA surface, upload it as an OpenGL texture.
-    Returns (tex_id, w, h).
-    """
-    text_surf = font.render(text, True, color)
-    w, h = text_surf.get_size()
-
-    box = pygame.Surface((w + 10, h + 6), pygame.SRCALPHA)
-    box.fill(bg)
-    box.blit(text_surf, (5, 3))
-
-    tex_data = pygame.image.tostring(box, "RGBA", True)
-    tw, th = box.get_size()
-
-    tex_id = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, tex_id)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, tw, th, 0, GL_RGBA, GL_UNSIGNED_BYTE, tex_data)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glBindTexture(GL_TEXTURE_2D, 0)
-
-    return tex_id, tw, th
-
-
 def begin_2d():
     """Switch to 2D pixel coordinate rendering (0,0)=top-left."""
     glMatrixMode(GL_PROJECTION)
@@ -159,23 +99,6 @@ def end_2d():
     glMatrixMode(GL_MODELVIEW)
 
 
-def draw_tex_2d(tex_id, x, y, w, h):
-    glDisable(GL_CULL_FACE)
-    glEnable(GL_TEXTURE_2D)
-    glBindTexture(GL_TEXTURE_2D, tex_id)
-
-    glColor4f(1, 1, 1, 1)
-    glBegin(GL_QUADS)
-    glTexCoord2f(0, 1); glVertex2f(x,     y)
-    glTexCoord2f(1, 1); glVertex2f(x + w, y)
-    glTexCoord2f(1, 0); glVertex2f(x + w, y + h)
-    glTexCoord2f(0, 0); glVertex2f(x,     y + h)
-    glEnd()
-
-    glBindTexture(GL_TEXTURE_2D, 0)
-    glDisable(GL_TEXTURE_2D)
-
-
 # -------------------------
 # Scene setup
 # -------------------------
@@ -338,13 +261,17 @@ def draw_textured_cube(x, y, z, size, tex):
 # Input
 # -------------------------
 def handle_input():
-    global last_mouse, orbiting, panning, zooming, yaw, pitch, distance, target, light_pos
+    global last_mouse, orbiting, panning, zooming, yaw, pitch, distance, target, light_pos, show_hud
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             return False
         if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
             return False
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            show_hud = not show_hud
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+            print(f"Frame trace written to {profiler.write_traces()}.csv/.json")
 
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1: orbiting = True
@@ -405,13 +332,8 @@ def handle_input():
 # -------------------------
 # Main
 # -------------------------
-def main():
-    pygame.init()
-    pygame.display.set_mode((WIN_W, WIN_H), pygame.DOUBLEBUF | pygame.OPENGL)
-    pygame.font.init()
-    font = pygame.font.SysFont("Consolas", 16)
-    pygame.display.set_caption("Lab: Textured Cube with KMITL Logo")
-
+def init_scene():
+    """GL state, textures and overlay text; returns what draw_frame() needs."""
     overlay_lines = [
         "LAB: Textured Cube with KMITL Logo",
         "Floor: Escher-style bird tessellation (floor.jpg) | GL_REPEAT tiling",
@@ -424,49 +346,88 @@ def main():
     set_projection()
 
     # Load textures
-    floor_tex = load_texture("floor.jpg")
-    cube_tex = load_texture("KMITL.png", use_alpha=True)  # Load with transparency
+    floor_tex = load_texture("floor.jpg", mipmaps=True)
+    cube_tex = load_texture("KMITL.png", use_alpha=True, mipmaps=True)  # Load with transparency
 
-    # Pre-create text textures
-    overlay_tex = []
-    for line in overlay_lines:
-        tid, tw, th = create_text_texture(font, line)
-        overlay_tex.append((tid, tw, th))
+    # Overlay text: built once, drawn as one batch from the glyph atlas
+    overlay = TextBatch(glyph_atlas("Consolas", 16))
+    overlay.add_lines(overlay_lines, 10, 10)
+
+    return floor_tex, cube_tex, overlay
+
+
+def draw_frame(floor_tex, cube_tex, overlay):
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    apply_camera()
+    glLightfv(GL_LIGHT0, GL_POSITION, light_pos)
+
+    # Draw 3D scene
+    draw_floor(floor_tex)
+    draw_textured_cube(0.0, 2.0, 0.0, 3.0, cube_tex)  # One cube with KMITL texture
+
+    # 2D OpenGL overlay
+    begin_2d()
+    overlay.draw()
+    if hud is not None and show_hud:
+        hud.draw(10, overlay.bottom + 10)
+    end_2d()
+
+
+def main():
+    global hud
+    pygame.init()
+    pygame.display.set_mode((WIN_W, WIN_H), pygame.DOUBLEBUF | pygame.OPENGL)
+    pygame.display.set_caption("Lab: Textured Cube with KMITL Logo")
+
+    floor_tex, cube_tex, overlay = init_scene()
+
+    hud = FrameHud(profiler, glyph_atlas("Consolas", 14), 1000.0 / FPS)
 
     clock = pygame.time.Clock()
     running = True
 
     try:
         while running:
-            running = handle_input()
-
-            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            profiler.begin_frame()
+            with profiler.phase("input"):
+                running = handle_input()
+            with profiler.phase("draw"):
+                draw_frame(floor_tex, cube_tex, overlay)
+
+            with profiler.phase("flip"):
+                pygame.display.flip()
+            clock.tick(FPS)
 
-            apply_camera()
-            glLightfv(GL_LIGHT0, GL_POSITION, light_pos)
+    finally:
+        # Cleanup
+        overlay.delete()
+        hud.delete()
+        delete_atlases()
+        release_texture(floor_tex)
+        release_texture(cube_tex)
+        pygame.quit()
 
-            # Draw 3D scene
-            draw_floor(floor_tex)
-            draw_textured_cube(0.0, 2.0, 0.0, 3.0, cube_tex)  # One cube with KMITL texture
 
-            # 2D OpenGL overlay
-            begin_2d()
-            x, y = 10, 10
-            for (tid, tw, th) in overlay_tex:
-                draw_tex_2d(tid, x, y, tw, th)
-                y += th + 6
-            end_2d()
+def draw_headless_frame(scene, frame):
+    global yaw
+    yaw = frame * headless.options.orbit
+    draw_frame(*scene)
 
-            pygame.display.flip()
-            clock.tick(FPS)
 
+def main_headless():
+    global WIN_W, WIN_H
+    WIN_W, WIN_H = headless.frame_size((WIN_W, WIN_H))
+    pygame.init()
+    try:
+        headless.run((WIN_W, WIN_H), init_scene, draw_headless_frame)
     finally:
-        # Cleanup
-        for (tid, _, _) in overlay_tex:
-            glDeleteTextures([tid])
         pygame.quit()
 
 
 if __name__ == "__main__":
-    main()
+    if headless.options is not None:
+        main_headless()
+    else:
+        main()
     
\ No newline at end of file
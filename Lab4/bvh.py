@@ -0,0 +1,348 @@
+import os
+import json
+import math
+import struct
+import numpy as np
+
+# -------------------------
+# Bounding volume hierarchy over spheres or triangles.
+#
+# Nodes are stored depth-first in flat arrays:
+#   node_lo / node_hi  (N, 3) bounds
+#   node_start         first primitive of a leaf (index into prim_order)
+#   node_count         number of primitives of a leaf, 0 for inner nodes
+#   node_right         right child of an inner node (the left child is i + 1)
+# -------------------------
+SAH_BINS = 16
+MAX_LEAF = 4
+# nodes this small are always leaves, the SAH decides between MIN_SPLIT and MAX_LEAF
+MIN_SPLIT = 2
+TRAVERSE_COST = 1.0
+INTERSECT_COST = 1.0
+EPS = 1e-4
+
+
+def surface_area(lo, hi):
+    d = np.maximum(hi - lo, 0.0)
+    return 2.0 * (d[..., 0] * d[..., 1] + d[..., 1] * d[..., 2] + d[..., 2] * d[..., 0])
+
+
+def best_sah_split(lo, hi, centroids):
+    """Binned SAH over all three axes at once. Returns (cost, axis, split position) or None."""
+    n = len(centroids)
+    c_lo = centroids.min(axis=0)
+    extent = centroids.max(axis=0) - c_lo
+    scale = np.where(extent > 0.0, SAH_BINS / np.where(extent > 0.0, extent, 1.0), 0.0)
+    bins = np.minimum(((centroids - c_lo) * scale).astype(np.int64), SAH_BINS - 1)
+
+    # one key per (axis, bin): sort once, then reduce every run of equal keys
+    keys = (bins.T + np.arange(3)[:, None] * SAH_BINS).ravel()
+    prims = np.tile(np.arange(n), 3)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    first = np.flatnonzero(np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]]))
+    used = sorted_keys[first]
+
+    counts = np.zeros(3 * SAH_BINS, dtype=np.int64)
+    counts[used] = np.diff(np.append(first, len(order)))
+    bin_lo = np.full((3 * SAH_BINS, 3), np.inf)
+    bin_hi = np.full((3 * SAH_BINS, 3), -np.inf)
+    bin_lo[used] = np.minimum.reduceat(lo[prims[order]], first)
+    bin_hi[used] = np.maximum.reduceat(hi[prims[order]], first)
+    counts = counts.reshape(3, SAH_BINS)
+    bin_lo = bin_lo.reshape(3, SAH_BINS, 3)
+    bin_hi = bin_hi.reshape(3, SAH_BINS, 3)
+
+    # sweep: split after bin k puts bins [0, k] left and (k, SAH_BINS) right
+    left_lo = np.minimum.accumulate(bin_lo, axis=1)[:, :-1]
+    left_hi = np.maximum.accumulate(bin_hi, axis=1)[:, :-1]
+    right_lo = np.minimum.accumulate(bin_lo[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    right_hi = np.maximum.accumulate(bin_hi[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    left_n = np.cumsum(counts, axis=1)[:, :-1]
+    right_n = n - left_n
+
+    valid = (left_n > 0) & (right_n > 0)
+    if not np.any(valid):
+        return None
+    cost = np.where(valid,
+                    surface_area(left_lo, left_hi) * left_n + surface_area(right_lo, right_hi) * right_n,
+                    np.inf)
+    axis, k = np.unravel_index(int(np.argmin(cost)), cost.shape)
+    split = c_lo[axis] + extent[axis] * (k + 1) / SAH_BINS
+    return float(cost[axis, k]), int(axis), split
+
+
+class BVH:
+    """
+    SAH bounding volume hierarchy for ray queries.
+
+    BVH.spheres(centers, radii) / BVH.triangles(v0, v1, v2) build it;
+    intersect(origin, direction) returns (t, primitive index) of the
+    nearest hit or None. `colors` holds an RGB color per primitive.
+    """
+
+    def __init__(self, kind, lo, hi, prims, colors=None):
+        self.kind = kind
+        n = len(lo)
+        self.colors = colors if colors is not None else np.tile([1.0, 0.0, 0.0], (n, 1))
+        self.build(lo, hi)
+
+        # traversal runs in plain Python, lists are much faster to index than arrays there
+        order = self.prim_order
+        self.prim_data = [p[order].tolist() for p in prims]
+        self.prim_colors = np.asarray(self.colors, dtype=np.float64)[order].tolist()
+        self.nodes = list(zip(self.node_lo.tolist(), self.node_hi.tolist(),
+                              self.node_start.tolist(), self.node_count.tolist(),
+                              self.node_right.tolist()))
+        self.nodes_visited = 0
+
+    @classmethod
+    def spheres(cls, centers, radii, colors=None):
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        radii = np.asarray(radii, dtype=np.float64).reshape(-1)
+        r = radii[:, None]
+        return cls("spheres", centers - r, centers + r, [centers, radii], colors)
+
+    @classmethod
+    def triangles(cls, v0, v1, v2, colors=None):
+        v0, v1, v2 = [np.asarray(v, dtype=np.float64).reshape(-1, 3) for v in (v0, v1, v2)]
+        lo = np.minimum(np.minimum(v0, v1), v2)
+        hi = np.maximum(np.maximum(v0, v1), v2)
+        return cls("triangles", lo, hi, [v0, v1 - v0, v2 - v0], colors)
+
+    def build(self, lo, hi):
+        n = len(lo)
+        centroids = (lo + hi) * 0.5
+        self.prim_order = np.arange(n)
+
+        node_lo, node_hi, node_start, node_count, node_right = [], [], [], [], []
+
+        # explicit stack of (node index to patch, start, end) keeps deep trees off the Python stack
+        stack = [(None, 0, n)]
+        while stack:
+            parent, start, end = stack.pop()
+            idx = self.prim_order[start:end]
+            node = len(node_lo)
+            if parent is not None:
+                node_right[parent] = node
+            node_lo.append(lo[idx].min(axis=0) if len(idx) else np.zeros(3))
+            node_hi.append(hi[idx].max(axis=0) if len(idx) else np.zeros(3))
+            node_start.append(start)
+            node_count.append(end - start)
+            node_right.append(-1)
+
+            count = end - start
+            if count <= MIN_SPLIT:
+                continue
+            split = best_sah_split(lo[idx], hi[idx], centroids[idx])
+            if split is None:
+                continue
+            cost, axis, position = split
+            node_area = surface_area(node_lo[-1], node_hi[-1])
+            leaf_cost = INTERSECT_COST * count
+            split_cost = TRAVERSE_COST + INTERSECT_COST * cost / max(node_area, 1e-30)
+            if count <= MAX_LEAF and split_cost >= leaf_cost:
+                continue
+
+            left = centroids[idx, axis] < position
+            mid = start + int(left.sum())
+            if mid == start or mid == end:
+                # rounding put everything on one side of the bin boundary: split at the median
+                left = np.zeros(count, dtype=bool)
+                left[np.argsort(centroids[idx, axis], kind="stable")[:count // 2]] = True
+                mid = start + count // 2
+            self.prim_order[start:end] = np.concatenate([idx[left], idx[~left]])
+
+            node_count[-1] = 0
+            # right child is pushed first so the left child directly follows its parent
+            stack.append((node, mid, end))
+            stack.append((None, start, mid))
+
+        self.node_lo = np.array(node_lo, dtype=np.float64).reshape(-1, 3)
+        self.node_hi = np.array(node_hi, dtype=np.float64).reshape(-1, 3)
+        self.node_start = np.array(node_start, dtype=np.int64)
+        self.node_count = np.array(node_count, dtype=np.int64)
+        self.node_right = np.array(node_right, dtype=np.int64)
+
+    @property
+    def bounds(self):
+        return self.node_lo[0], self.node_hi[0]
+
+    def intersect(self, origin, direction):
+        """Nearest hit along the ray: (t, primitive index) or None."""
+        ox, oy, oz = origin
+        dx, dy, dz = direction
+        ix = 1.0 / dx if dx != 0.0 else math.inf
+        iy = 1.0 / dy if dy != 0.0 else math.inf
+        iz = 1.0 / dz if dz != 0.0 else math.inf
+
+        nodes = self.nodes
+        hit_prim = -1
+        t_best = math.inf
+        visited = 0
+        stack = [0]
+
+        while stack:
+            i = stack.pop()
+            (lx, ly, lz), (hx, hy, hz), start, count, right = nodes[i]
+            visited += 1
+
+            # slab test against the node box
+            t0 = (lx - ox) * ix; t1 = (hx - ox) * ix
+            if t0 > t1: t0, t1 = t1, t0
+            t_near, t_far = t0, t1
+            t0 = (ly - oy) * iy; t1 = (hy - oy) * iy
+            if t0 > t1: t0, t1 = t1, t0
+            if t0 > t_near: t_near = t0
+            if t1 < t_far: t_far = t1
+            t0 = (lz - oz) * iz; t1 = (hz - oz) * iz
+            if t0 > t1: t0, t1 = t1, t0
+            if t0 > t_near: t_near = t0
+            if t1 < t_far: t_far = t1
+            if t_near > t_far or t_far < EPS or t_near > t_best:
+                continue
+
+            if count == 0:
+                # visit the child on the ray's side first
+                left = i + 1
+                if self.right_is_nearer(left, right, dx, dy, dz):
+                    stack.append(left); stack.append(right)
+                else:
+                    stack.append(right); stack.append(left)
+                continue
+
+            for k in range(start, start + count):
+                t = self.intersect_prim(k, ox, oy, oz, dx, dy, dz)
+                if t is not None and t < t_best:
+                    t_best = t
+                    hit_prim = k
+
+        self.nodes_visited += visited
+        if hit_prim < 0:
+            return None
+        return t_best, hit_prim
+
+    def right_is_nearer(self, left, right, dx, dy, dz):
+        # compare the child box centers along the ray direction
+        (llx, lly, llz), (lhx, lhy, lhz) = self.nodes[left][0], self.nodes[left][1]
+        (rlx, rly, rlz), (rhx, rhy, rhz) = self.nodes[right][0], self.nodes[right][1]
+        dl = (llx + lhx) * dx + (lly + lhy) * dy + (llz + lhz) * dz
+        dr = (rlx + rhx) * dx + (rly + rhy) * dy + (rlz + rhz) * dz
+        return dr < dl
+
+    def intersect_prim(self, k, ox, oy, oz, dx, dy, dz):
+        if self.kind == "spheres":
+            (cx, cy, cz), r = self.prim_data[0][k], self.prim_data[1][k]
+            fx = ox - cx; fy = oy - cy; fz = oz - cz
+            a = dx*dx + dy*dy + dz*dz
+            b = 2.0 * (fx*dx + fy*dy + fz*dz)
+            c = fx*fx + fy*fy + fz*fz - r*r
+            disc = b*b - 4.0*a*c
+            if disc < 0.0:
+                return None
+            sq = math.sqrt(disc)
+            t = (-b - sq) / (2.0 * a)
+            if t > EPS:
+                return t
+            t = (-b + sq) / (2.0 * a)
+            return t if t > EPS else None
+
+        # Moller-Trumbore
+        (ax, ay, az), (e1x, e1y, e1z), (e2x, e2y, e2z) = (p[k] for p in self.prim_data)
+        px = dy*e2z - dz*e2y; py = dz*e2x - dx*e2z; pz = dx*e2y - dy*e2x
+        det = e1x*px + e1y*py + e1z*pz
+        if -1e-12 < det < 1e-12:
+            return None
+        inv = 1.0 / det
+        tx = ox - ax; ty = oy - ay; tz = oz - az
+        u = (tx*px + ty*py + tz*pz) * inv
+        if u < 0.0 or u > 1.0:
+            return None
+        qx = ty*e1z - tz*e1y; qy = tz*e1x - tx*e1z; qz = tx*e1y - ty*e1x
+        v = (dx*qx + dy*qy + dz*qz) * inv
+        if v < 0.0 or u + v > 1.0:
+            return None
+        t = (e2x*qx + e2y*qy + e2z*qz) * inv
+        return t if t > EPS else None
+
+    def normal(self, k, p, direction):
+        """Unit surface normal of primitive k at point p, facing against the ray."""
+        if self.kind == "spheres":
+            (cx, cy, cz), r = self.prim_data[0][k], self.prim_data[1][k]
+            return ((p[0] - cx) / r, (p[1] - cy) / r, (p[2] - cz) / r)
+
+        _, (e1x, e1y, e1z), (e2x, e2y, e2z) = (q[k] for q in self.prim_data)
+        nx = e1y*e2z - e1z*e2y; ny = e1z*e2x - e1x*e2z; nz = e1x*e2y - e1y*e2x
+        l = math.sqrt(nx*nx + ny*ny + nz*nz) or 1.0
+        if nx*direction[0] + ny*direction[1] + nz*direction[2] > 0.0:
+            l = -l
+        return (nx / l, ny / l, nz / l)
+
+    def color(self, k):
+        return self.prim_colors[k]
+
+
+# HW4 binary scene (see HW4/PartC/io_scene.py): magic, version, sphere count,
+# then float32 columns pos (3), radius (1), color (4), material (2) per sphere
+HW4_BINARY_MAGIC = b"HWSCENE\0"
+HW4_BINARY_VERSION = 1
+HW4_BINARY_HEADER = struct.Struct("<8sII")
+HW4_BINARY_WIDTH = 3 + 1 + 4 + 2
+
+
+def load_scene(path):
+    """
+    Builds a BVH from a scene file, picked by extension:
+     - .json        : the HW4 scene editor format (list of spheres with pos / radius / color)
+     - .jsonl       : the same spheres, one JSON object per line
+     - .bin / .scene: the HW4 binary scene format
+     - .obj         : triangle mesh (v / f records, faces fan-triangulated)
+    Any other extension raises ValueError.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".json", ".jsonl"):
+        with open(path, "r") as f:
+            if ext == ".json":
+                items = json.load(f)
+            else:
+                items = [json.loads(line) for line in f if line.strip()]
+        items = [item for item in items if item.get("type") == "sphere"]
+        centers = [item["pos"] for item in items]
+        radii = [item["radius"] for item in items]
+        colors = [item["color"][:3] for item in items]
+        return BVH.spheres(centers, radii, colors)
+    if ext in (".bin", ".scene"):
+        return load_binary_spheres(path)
+    if ext != ".obj":
+        raise ValueError(f"Unsupported scene file {path!r}: expected .json, .jsonl, .bin, .scene or .obj")
+
+    vertices = []
+    tris = []
+    with open(path, "r") as f:
+        for line in f:
+            values = line.split()
+            if not values: continue
+            if values[0] == 'v':
+                vertices.append(list(map(float, values[1:4])))
+            elif values[0] == 'f':
+                idx = [int(v.split('/')[0]) for v in values[1:]]
+                idx = [i - 1 if i > 0 else len(vertices) + i for i in idx]
+                for i in range(1, len(idx) - 1):
+                    tris.append((idx[0], idx[i], idx[i + 1]))
+    vertices = np.array(vertices, dtype=np.float64).reshape(-1, 3)
+    tris = np.array(tris, dtype=np.int64).reshape(-1, 3)
+    return BVH.triangles(vertices[tris[:, 0]], vertices[tris[:, 1]], vertices[tris[:, 2]])
+
+
+def load_binary_spheres(path):
+    with open(path, "rb") as f:
+        magic, version, count = HW4_BINARY_HEADER.unpack(f.read(HW4_BINARY_HEADER.size))
+        if magic != HW4_BINARY_MAGIC or version != HW4_BINARY_VERSION:
+            raise ValueError(f"{path!r} is not a version {HW4_BINARY_VERSION} HW4 binary scene")
+        data = np.fromfile(f, dtype="<f4", count=count * HW4_BINARY_WIDTH).astype(np.float64)
+    if len(data) != count * HW4_BINARY_WIDTH:
+        raise ValueError(f"{path!r} is truncated")
+    centers = data[:3 * count].reshape(-1, 3)
+    radii = data[3 * count:4 * count]
+    colors = data[4 * count:8 * count].reshape(-1, 4)[:, :3]
+    return BVH.spheres(centers, radii, colors)
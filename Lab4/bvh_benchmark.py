@@ -0,0 +1,76 @@
+import sys
+import time
+import numpy as np
+
+from bvh import BVH
+
+# -------------------------
+# BVH scaling benchmark: random spheres at constant density, from 10 to
+# 100k primitives. Per-ray cost should grow roughly with log(n) while a
+# brute-force loop grows linearly.
+#
+#   python bvh_benchmark.py [max_primitives] [rays]
+# -------------------------
+SIZES = [10, 100, 1000, 10000, 100000]
+BRUTE_FORCE_LIMIT = 1000
+
+
+def random_spheres(n, rng):
+    # keep the density constant: the cube side grows with n^(1/3)
+    side = 4.0 * n ** (1.0 / 3.0)
+    centers = rng.uniform(-side / 2, side / 2, (n, 3))
+    radii = rng.uniform(0.3, 1.0, n)
+    return centers, radii, side
+
+
+def random_rays(count, side, rng):
+    origins = rng.uniform(-side, side, (count, 3))
+    targets = rng.uniform(-side / 2, side / 2, (count, 3))
+    dirs = targets - origins
+    dirs /= np.linalg.norm(dirs, axis=1)[:, None]
+    return origins.tolist(), dirs.tolist()
+
+
+def brute_force(bvh, origin, direction):
+    best = None
+    for k in range(len(bvh.prim_data[0])):
+        t = bvh.intersect_prim(k, *origin, *direction)
+        if t is not None and (best is None or t < best[0]):
+            best = (t, k)
+    return best
+
+
+def main():
+    max_n = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    n_rays = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = np.random.default_rng(0)
+
+    print(f"{'prims':>8} {'nodes':>8} {'build s':>8} {'us/ray':>8} {'nodes/ray':>10} {'brute us/ray':>13}")
+    for n in [s for s in SIZES if s <= max_n]:
+        centers, radii, side = random_spheres(n, rng)
+
+        t = time.perf_counter()
+        bvh = BVH.spheres(centers, radii)
+        build = time.perf_counter() - t
+
+        origins, dirs = random_rays(n_rays, side, rng)
+        bvh.nodes_visited = 0
+        t = time.perf_counter()
+        hits = [bvh.intersect(o, d) for o, d in zip(origins, dirs)]
+        per_ray = (time.perf_counter() - t) / n_rays * 1e6
+        nodes_per_ray = bvh.nodes_visited / n_rays
+
+        brute = "-"
+        if n <= BRUTE_FORCE_LIMIT:
+            count = min(n_rays, 200)
+            t = time.perf_counter()
+            expected = [brute_force(bvh, o, d) for o, d in zip(origins[:count], dirs[:count])]
+            brute = f"{(time.perf_counter() - t) / count * 1e6:.1f}"
+            for got, want in zip(hits, expected):
+                assert (got is None) == (want is None) and (got is None or abs(got[0] - want[0]) < 1e-9)
+
+        print(f"{n:>8} {len(bvh.nodes):>8} {build:>8.2f} {per_ray:>8.1f} {nodes_per_ray:>10.1f} {brute:>13}")
+
+
+if __name__ == "__main__":
+    main()
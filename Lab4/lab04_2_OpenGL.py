@@ -1,5 +1,10 @@
 import math
+import numpy as np
 import pygame
+from functools import partial
+
+import bvh
+from tile_engine import TileRenderer, ProgressiveRenderer
 
 def v_add(a, b):
     return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
@@ -79,7 +84,22 @@ def trace_ray(ray_origin, ray_dir, lights, background_color):
 
     p = v_add(ray_origin, v_mul(ray_dir, t))
 
-    base_color = (1.0, 0.0, 0.0)
+    return shade(p, hit_normal, ray_dir, (1.0, 0.0, 0.0), lights)
+
+def trace_ray_bvh(ray_origin, ray_dir, scene, lights, background_color):
+    """Like trace_ray, but against every primitive of a bvh.BVH scene."""
+    hit = scene.intersect(ray_origin, ray_dir)
+
+    if hit is None:
+        return background_color
+
+    t, prim = hit
+    p = v_add(ray_origin, v_mul(ray_dir, t))
+    hit_normal = scene.normal(prim, p, ray_dir)
+
+    return shade(p, hit_normal, ray_dir, scene.color(prim), lights)
+
+def shade(p, hit_normal, ray_dir, base_color, lights):
     spec_color = (0.6, 0.6, 0.6)
     ambient_k = 0.1
     shininess = 50.0
@@ -114,9 +134,142 @@ def trace_ray(ray_origin, ray_dir, lights, background_color):
     
     return (r, g, b)
 
-def render(width, height):
-    eye     = (0.0, 0.5, -4.0)
-    look_at = (0.0, 0.0,  0.0)
+# -------------------------
+# Ray packets: the same math as above on (..., 3) NumPy arrays, one ray per
+# pixel. Operations are kept in the same order as the scalar helpers so
+# both paths produce bit-identical images.
+# -------------------------
+def p_dot(a, b):
+    return a[..., 0]*b[..., 0] + a[..., 1]*b[..., 1] + a[..., 2]*b[..., 2]
+
+def p_norm(a):
+    l = np.sqrt(p_dot(a, a))[..., None]
+    safe = np.where(l == 0, 1.0, l)
+    return np.where(l == 0, 0.0, a / safe)
+
+def intersect_sphere_packet(ray_origin, ray_dirs):
+    """Returns (hit mask, t, normals) for an (..., 3) array of ray directions."""
+    c = np.array((0.0, 0.0, 0.0))
+    r = 1.0
+
+    e = np.asarray(ray_origin, dtype=np.float64)
+    oc = e - c
+
+    A = p_dot(ray_dirs, ray_dirs)
+    B = 2.0 * p_dot(oc, ray_dirs)
+    C = p_dot(oc, oc) - (r * r)
+
+    discriminant = B*B - 4*A*C
+    hit = discriminant >= 0
+
+    sqrt_disc = np.sqrt(np.where(hit, discriminant, 0.0))
+    t1 = (-B - sqrt_disc) / (2.0 * A)
+    t2 = (-B + sqrt_disc) / (2.0 * A)
+
+    t = np.where(t1 > 1e-4, t1, np.where(t2 > 1e-4, t2, np.inf))
+    hit &= t != np.inf
+
+    p = e + ray_dirs * np.where(hit, t, 0.0)[..., None]
+    n = (p - c) / r
+
+    return hit, t, n
+
+def trace_ray_packet(ray_origin, ray_dirs, lights, background_color):
+    """Shades an (..., 3) array of rays, returns (..., 3) float colors."""
+    hit, t, hit_normal = intersect_sphere_packet(ray_origin, ray_dirs)
+
+    colors = np.empty(ray_dirs.shape)
+    colors[...] = background_color
+
+    # only shade the rays that hit something
+    d = ray_dirs[hit]
+    n = hit_normal[hit]
+    p = np.asarray(ray_origin, dtype=np.float64) + d * t[hit][:, None]
+
+    base_color = (1.0, 0.0, 0.0)
+    spec_color = (0.6, 0.6, 0.6)
+    ambient_k = 0.1
+    shininess = 50.0
+
+    rgb = np.empty(d.shape)
+    rgb[:] = [ambient_k * c for c in base_color]
+
+    view_dir = p_norm(d * -1.0)
+
+    for light_pos, light_col in lights:
+        L = p_norm(np.asarray(light_pos, dtype=np.float64) - p)
+
+        ndotl = p_dot(n, L)
+        lit = ndotl > 0.0
+        diff = ndotl
+
+        I = L * -1.0
+        refl = I - n * (2.0 * p_dot(I, n))[:, None]
+        rv = np.maximum(0.0, p_dot(refl, view_dir))
+        spec = np.where(rv > 0.0, rv ** shininess, 0.0)
+
+        for k in range(3):
+            term = light_col[k] * (base_color[k] * diff + spec_color[k] * spec)
+            rgb[:, k] = np.where(lit, rgb[:, k] + term, rgb[:, k])
+
+    colors[hit] = np.clip(rgb, 0.0, 1.0)
+    return colors
+
+def primary_rays(camera, width, height, i, j):
+    """Normalized primary ray directions for pixel columns i and rows j, shape (len(j), len(i), 3)."""
+    eye, forward, right, up_cam, half_w, half_h = camera
+
+    j = np.asarray(j, dtype=np.float64)[:, None]
+    i = np.asarray(i, dtype=np.float64)[None, :]
+    ndc_y = 1.0 - 2.0 * (j + 0.5) / float(height)
+    ndc_x = 2.0 * (i + 0.5) / float(width) - 1.0
+
+    px = ndc_x * half_w
+    py = ndc_y * half_h
+
+    dirs = np.empty((j.shape[0], i.shape[1], 3))
+    for k in range(3):
+        dirs[..., k] = forward[k] + (right[k] * px + up_cam[k] * py)
+
+    return p_norm(dirs)
+
+LIGHTS = [
+    ((-5.0,  5.0, -5.0), (1.0, 1.0, 1.0)),
+    (( 6.0, -6.0, -6.0), (0.25, 0.25, 0.25)),
+]
+BACKGROUND_COLOR = (0.25, 0.25, 0.25)
+
+# None = one render worker per CPU core, 1 = trace in the main process
+RENDER_WORKERS = None
+# True = trace whole tiles as NumPy ray packets, False = the scalar per-pixel reference
+RENDER_PACKETS = True
+# integer upscale of the 320x240 image on screen
+DISPLAY_SCALE = 1
+
+EYE = (0.0, 0.5, -4.0)
+LOOK_AT = (0.0, 0.0, 0.0)
+
+# None = the analytic unit sphere, or a scene file traced through a BVH:
+# HW4 editor scene (.json, .jsonl or binary .bin/.scene spheres) or a triangle mesh (.obj),
+# e.g. "../HW4/PartC/scene.json"; other extensions are rejected (bvh.load_scene)
+SCENE_FILE = None
+
+# BVH scenes are built once per process (the main one and every render worker)
+loaded_scenes = {}
+
+def get_scene(path):
+    if path not in loaded_scenes:
+        loaded_scenes[path] = bvh.load_scene(path)
+    return loaded_scenes[path]
+
+def scene_framing(scene):
+    """Center and bounding radius of a BVH scene, used to aim the camera."""
+    lo, hi = scene.bounds
+    center = tuple(((lo + hi) * 0.5).tolist())
+    radius = float(np.linalg.norm(hi - lo)) * 0.5
+    return center, max(radius, 1e-3)
+
+def setup_camera(width, height, eye=EYE, look_at=LOOK_AT):
     up      = (0.0, 1.0,  0.0)
 
     fov_y = math.radians(60.0)
@@ -129,65 +282,173 @@ def render(width, height):
     half_h = math.tan(fov_y / 2.0)
     half_w = aspect * half_h
 
-    lights = [
-        ((-5.0,  5.0, -5.0), (1.0, 1.0, 1.0)),
-        (( 6.0, -6.0, -6.0), (0.25, 0.25, 0.25)),
-    ]
-    background_color = (0.25, 0.25, 0.25)
+    return eye, forward, right, up_cam, half_w, half_h
+
+def trace_pixel(camera, i, j, width, height, lights=LIGHTS, scene=None):
+    eye, forward, right, up_cam, half_w, half_h = camera
+
+    ndc_y = 1.0 - 2.0 * (j + 0.5) / float(height)
+    ndc_x = 2.0 * (i + 0.5) / float(width) - 1.0
+
+    px = ndc_x * half_w
+    py = ndc_y * half_h
+
+    dir_world = v_add(
+        forward,
+        v_add(v_mul(right, px), v_mul(up_cam, py))
+    )
+    dir_world = v_norm(dir_world)
+
+    if scene is None:
+        color = trace_ray(eye, dir_world, lights, BACKGROUND_COLOR)
+    else:
+        color = trace_ray_bvh(eye, dir_world, scene, lights, BACKGROUND_COLOR)
+
+    return (
+        int(color[0]*255),
+        int(color[1]*255),
+        int(color[2]*255),
+    )
+
+def render(width, height):
+    camera = setup_camera(width, height)
 
     framebuffer = [[(0, 0, 0) for _ in range(width)] for _ in range(height)]
 
     for j in range(height):
-        ndc_y = 1.0 - 2.0 * (j + 0.5) / float(height)
-        
         for i in range(width):
-            ndc_x = 2.0 * (i + 0.5) / float(width) - 1.0
-
-            px = ndc_x * half_w
-            py = ndc_y * half_h
+            framebuffer[j][i] = trace_pixel(camera, i, j, width, height)
 
-            dir_world = v_add(
-                forward,
-                v_add(v_mul(right, px), v_mul(up_cam, py))
-            )
-            dir_world = v_norm(dir_world)
-
-            color = trace_ray(eye, dir_world, lights, background_color)
-            
-            framebuffer[j][i] = (
-                int(color[0]*255),
-                int(color[1]*255),
-                int(color[2]*255),
-            )
+    return framebuffer
 
+# -------------------------
+# Progressive refinement: a pass with step s traces one pixel per s x s
+# block and stretches it over the block. Samples already traced by the
+# previous (2s) pass stay in the framebuffer and are not traced again.
+# -------------------------
+def new_samples(x0, y0, x1, y1, step, prev_step):
+    i = np.arange(x0, x1, step)
+    j = np.arange(y0, y1, step)
+    todo = np.ones((len(j), len(i)), dtype=bool)
+    if prev_step:
+        todo &= (j[:, None] % prev_step == 0) & (i[None, :] % prev_step == 0)
+        todo = ~todo
+    return i, j, todo
+
+def fill_blocks(framebuffer, x0, y0, x1, y1, step):
+    if step == 1:
+        return
+    samples = framebuffer[y0:y1:step, x0:x1:step]
+    blocks = np.repeat(np.repeat(samples, step, axis=0), step, axis=1)
+    framebuffer[y0:y1, x0:x1] = blocks[:y1 - y0, :x1 - x0]
+
+def render_tile(framebuffer, x0, y0, x1, y1, eye=EYE, lights=LIGHTS, step=1, prev_step=None, scene_file=None):
+    """Trace pixels [x0, x1) x [y0, y1) into a (height, width, 3) uint8 array."""
+    height, width = framebuffer.shape[:2]
+    scene = None
+    if scene_file is None:
+        camera = setup_camera(width, height, eye)
+    else:
+        scene = get_scene(scene_file)
+        camera = setup_camera(width, height, eye, scene_framing(scene)[0])
+
+    i, j, todo = new_samples(x0, y0, x1, y1, step, prev_step)
+    for b, y in enumerate(j.tolist()):
+        for a, x in enumerate(i.tolist()):
+            if todo[b, a]:
+                framebuffer[y, x] = trace_pixel(camera, x, y, width, height, lights, scene)
+    fill_blocks(framebuffer, x0, y0, x1, y1, step)
+
+def render_tile_packet(framebuffer, x0, y0, x1, y1, eye=EYE, lights=LIGHTS, step=1, prev_step=None):
+    """Packet version of render_tile: traces the whole tile with array operations."""
+    height, width = framebuffer.shape[:2]
+    camera = setup_camera(width, height, eye)
+
+    i, j, todo = new_samples(x0, y0, x1, y1, step, prev_step)
+    dirs = primary_rays(camera, width, height, i, j)[todo]
+    colors = trace_ray_packet(camera[0], dirs, lights, BACKGROUND_COLOR)
+
+    samples = framebuffer[y0:y1:step, x0:x1:step]
+    samples[todo] = (colors * 255).astype(np.uint8)
+    fill_blocks(framebuffer, x0, y0, x1, y1, step)
+
+def render_packet(width, height):
+    framebuffer = np.zeros((height, width, 3), dtype=np.uint8)
+    render_tile_packet(framebuffer, 0, 0, width, height)
     return framebuffer
 
-def main():
+def orbit_eye(yaw, center=LOOK_AT, dist=4.0):
+    # yaw = 0 around the origin at distance 4 is the original EYE
+    return (center[0] + dist * math.sin(yaw),
+            center[1] + dist * 0.125,
+            center[2] - dist * math.cos(yaw))
+
+def main(workers=RENDER_WORKERS, packets=RENDER_PACKETS, scale=DISPLAY_SCALE, scene_file=SCENE_FILE):
     width, height = 320, 240
 
     pygame.init()
-    screen = pygame.display.set_mode((width, height))
+    screen = pygame.display.set_mode((width * scale, height * scale))
     pygame.display.set_caption("CPU Ray Tracer - Analytic Sphere")
 
-    surface = pygame.Surface((width, height))
     clock = pygame.time.Clock()
 
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
+    center, dist = LOOK_AT, 4.0
+    if scene_file is None:
+        trace_tile = render_tile_packet if packets else render_tile
+    else:
+        # the packet path only knows the analytic sphere, scenes go through the BVH per pixel
+        center, radius = scene_framing(get_scene(scene_file))
+        dist = 2.5 * radius
+        trace_tile = partial(render_tile, scene_file=scene_file)
+        pygame.display.set_caption(f"CPU Ray Tracer - {scene_file}")
+    engine = TileRenderer(width, height, trace_tile, workers=workers)
+
+    # the surface reads the framebuffer memory directly, so presenting a frame is a single blit
+    surface = pygame.image.frombuffer(engine.framebuffer, (width, height), "RGB")
+    # upscaled copy in the same pixel format, reused every frame
+    scaled = pygame.Surface(screen.get_size(), 0, surface) if scale != 1 else None
+
+    progressive = ProgressiveRenderer(engine)
+    yaw = 0.0
+    key_light_y = LIGHTS[0][0][1]
 
-        framebuffer = render(width, height)
-
-        for y in range(height):
-            for x in range(width):
-                surface.set_at((x, y), framebuffer[y][x])
-
-        screen.blit(surface, (0, 0))
-        pygame.display.flip()
-
-        clock.tick(30)
+    running = True
+    try:
+        while running:
+            # once the image is final, sleep until something happens instead of spinning
+            if progressive.converged:
+                events = [pygame.event.wait()] + pygame.event.get()
+            else:
+                events = pygame.event.get()
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+
+            # Left / Right orbit the camera, Up / Down move the key light
+            keys = pygame.key.get_pressed()
+            if keys[pygame.K_LEFT]: yaw -= 0.05
+            if keys[pygame.K_RIGHT]: yaw += 0.05
+            if keys[pygame.K_UP]: key_light_y += 0.2
+            if keys[pygame.K_DOWN]: key_light_y -= 0.2
+
+            (lx, _, lz), key_color = LIGHTS[0]
+            lights = [((lx, key_light_y, lz), key_color)] + LIGHTS[1:]
+
+            if not progressive.render(orbit_eye(yaw, center, dist), lights):
+                continue
+
+            if scaled is None:
+                screen.blit(surface, (0, 0))
+            else:
+                pygame.transform.scale(surface, scaled.get_size(), scaled)
+                screen.blit(scaled, (0, 0))
+            pygame.display.flip()
+
+            clock.tick(30)
+    finally:
+        # drop the surface first, it holds a pointer into the shared memory
+        del surface, scaled
+        engine.close()
 
     pygame.quit()
 
@@ -0,0 +1,134 @@
+import os
+import numpy as np
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+# per-worker state, set once by init_worker
+worker_shm = None
+worker_framebuffer = None
+worker_trace_tile = None
+
+
+def attach_shared_memory(name):
+    # Python 3.13+ can skip the resource tracker for memory the parent owns
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        return SharedMemory(name=name)
+
+
+def init_worker(shm_name, shape, trace_tile):
+    global worker_shm, worker_framebuffer, worker_trace_tile
+    worker_shm = attach_shared_memory(shm_name)
+    worker_framebuffer = np.ndarray(shape, dtype=np.uint8, buffer=worker_shm.buf)
+    worker_trace_tile = trace_tile
+
+
+def run_tile(job):
+    (x0, y0, x1, y1), args = job
+    worker_trace_tile(worker_framebuffer, x0, y0, x1, y1, *args)
+    return job
+
+
+def split_tiles(width, height, tile_size):
+    tiles = []
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            tiles.append((x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height)))
+    return tiles
+
+
+class TileRenderer:
+    """
+    Splits the image into tiles and traces them on a process pool.
+    Every worker writes its tiles straight into one shared-memory
+    (height, width, 3) uint8 framebuffer, so nothing is copied back.
+
+    trace_tile(framebuffer, x0, y0, x1, y1, *args) must be a module-level
+    function (it is pickled once per worker) that fills framebuffer[y0:y1, x0:x1];
+    args are whatever is passed to render().
+    workers=None uses one worker per core, workers=1 traces in-process.
+    """
+
+    def __init__(self, width, height, trace_tile, workers=None, tile_size=32):
+        self.width = width
+        self.height = height
+        self.trace_tile = trace_tile
+        self.workers = workers or os.cpu_count() or 1
+        self.tiles = split_tiles(width, height, tile_size)
+
+        shape = (height, width, 3)
+        self.shm = SharedMemory(create=True, size=height * width * 3)
+        self.framebuffer = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.framebuffer[:] = 0
+
+        self.pool = None
+        if self.workers > 1:
+            self.pool = Pool(self.workers, initializer=init_worker,
+                             initargs=(self.shm.name, shape, trace_tile))
+
+    def render(self, *args):
+        """Trace every tile and return the (height, width, 3) uint8 framebuffer."""
+        if self.pool is None:
+            for x0, y0, x1, y1 in self.tiles:
+                self.trace_tile(self.framebuffer, x0, y0, x1, y1, *args)
+        else:
+            # small tiles + unordered results keep every core busy until the end
+            for _ in self.pool.imap_unordered(run_tile, [(tile, args) for tile in self.tiles]):
+                pass
+        return self.framebuffer
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.shm is not None:
+            self.framebuffer = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ProgressiveRenderer:
+    """
+    Refines the image over several frames and keeps it once it is final.
+
+    Each call to render(*scene) runs one pass of the TileRenderer with a
+    pixel step from `steps` (coarse to fine); trace_tile receives
+    (*scene, step, prev_step). A scene that compares equal to the last one
+    continues the refinement, a different one restarts at the coarsest
+    step. Once the step-1 pass is done render() does nothing and returns
+    False, so the caller can stop redrawing.
+
+    Tile sizes must be multiples of the coarsest step.
+    """
+
+    def __init__(self, engine, steps=(8, 4, 2, 1)):
+        self.engine = engine
+        self.steps = steps
+        self.scene = None
+        self.level = 0
+
+    @property
+    def converged(self):
+        return self.scene is not None and self.level >= len(self.steps)
+
+    def render(self, *scene):
+        if scene != self.scene:
+            self.scene = scene
+            self.level = 0
+        if self.converged:
+            return False
+
+        step = self.steps[self.level]
+        prev_step = self.steps[self.level - 1] if self.level > 0 else None
+        self.engine.render(*scene, step, prev_step)
+        self.level += 1
+        return True
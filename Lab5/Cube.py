@@ -1,36 +1,38 @@
 from OpenGL.GL import *
 from Mesh import *
+import numpy as np
 import pygame
 
 class Cube(Mesh):
 
-    def __init__(self, draw_type):
-        self.vertices = [(0.5, -0.5, 0.5),
-                         (-0.5, -0.5, 0.5),
-                         (0.5, 0.5, 0.5),
-                         (-0.5, 0.5, 0.5),
-                         (0.5, 0.5, -0.5),
-                         (-0.5, 0.5, -0.5),
-                         (0.5, -0.5, -0.5),
-                         (-0.5, -0.5, -0.5),
-                         (0.5, 0.5, 0.5),
-                         (-0.5, 0.5, 0.5),
-                         (0.5, 0.5, -0.5),
-                         (-0.5, 0.5, -0.5),
-                         (0.5, -0.5, -0.5),
-                         (0.5, -0.5, 0.5),
-                         (-0.5, -0.5, 0.5),
-                         (-0.5, -0.5, -0.5),
-                         (-0.5, -0.5, 0.5),
-                         (-0.5, 0.5, 0.5),
-                         (-0.5, 0.5, -0.5),
-                         (-0.5, -0.5, -0.5),
-                         (0.5, -0.5, -0.5),
-                         (0.5, 0.5, -0.5),
-                         (0.5, 0.5, 0.5),
-                         (0.5, -0.5, 0.5)]
+    def __init__(self, draw_type, use_buffers=False):
+        self.use_buffers = use_buffers
+        self.vertices = np.array([(0.5, -0.5, 0.5),
+                                  (-0.5, -0.5, 0.5),
+                                  (0.5, 0.5, 0.5),
+                                  (-0.5, 0.5, 0.5),
+                                  (0.5, 0.5, -0.5),
+                                  (-0.5, 0.5, -0.5),
+                                  (0.5, -0.5, -0.5),
+                                  (-0.5, -0.5, -0.5),
+                                  (0.5, 0.5, 0.5),
+                                  (-0.5, 0.5, 0.5),
+                                  (0.5, 0.5, -0.5),
+                                  (-0.5, 0.5, -0.5),
+                                  (0.5, -0.5, -0.5),
+                                  (0.5, -0.5, 0.5),
+                                  (-0.5, -0.5, 0.5),
+                                  (-0.5, -0.5, -0.5),
+                                  (-0.5, -0.5, 0.5),
+                                  (-0.5, 0.5, 0.5),
+                                  (-0.5, 0.5, -0.5),
+                                  (-0.5, -0.5, -0.5),
+                                  (0.5, -0.5, -0.5),
+                                  (0.5, 0.5, -0.5),
+                                  (0.5, 0.5, 0.5),
+                                  (0.5, -0.5, 0.5)], dtype=np.float32)
 
-        self.triangles = [0, 2, 3, 0, 3, 1, 8, 4, 5, 8, 5, 9, 10, 6, 7, 10, 7, 11, 12,
-             13, 14, 12, 14, 15, 16, 17, 18, 16, 18, 19, 20, 21, 22, 20, 22, 23]
+        self.triangles = np.array([0, 2, 3, 0, 3, 1, 8, 4, 5, 8, 5, 9, 10, 6, 7, 10, 7, 11, 12,
+             13, 14, 12, 14, 15, 16, 17, 18, 16, 18, 19, 20, 21, 22, 20, 22, 23], dtype=np.uint32)
 
         self.draw_type = draw_type
\ No newline at end of file
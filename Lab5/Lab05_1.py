@@ -2,6 +2,9 @@ from OpenGL.GL import *
 from pygame.locals import *
 from OpenGL.GLU import *
 from Cube import *
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")) # headless, mesh_cache, textures, ...: one copy for every lab
 from LoadMesh import *
 
 pygame.init()
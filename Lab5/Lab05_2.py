@@ -1,6 +1,9 @@
 from pygame.locals import *
 from OpenGL.GLU import *
 from Cube import *
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")) # headless, mesh_cache, textures, ...: one copy for every lab
 from LoadMesh import *
 
 pygame.init()
@@ -14,7 +17,7 @@ drawing_color = (1, 1, 1, 1)
 screen = pygame.display.set_mode((screen_width, screen_height), DOUBLEBUF | OPENGL)
 pygame.display.set_caption('Transformations in Python')
 cube = Cube(GL_LINE_LOOP)
-mesh = LoadMesh("teapot.obj", GL_LINE_LOOP)
+mesh = LoadMesh("teapot.obj", GL_LINE_LOOP, use_buffers=True)
 
 def initialise():
     glClearColor(background_color[0], background_color[1], background_color[2], background_color[3])
@@ -1,27 +1,172 @@
 from OpenGL.GL import *
 from Mesh import *
+import numpy as np
 import pygame
 
+import mesh_cache
+
+# record prefix -> (line class, length of the prefix including its separator)
+RECORDS = {
+    "v": (1, 2),
+    "vn": (2, 3),
+    "vt": (3, 3),
+    "f": (4, 2),
+}
+
+
+class ObjLines:
+    """Byte-level view of an .obj file with every line classified by its prefix."""
+
+    def __init__(self, data):
+        buf = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == ord("\n"))
+        self.starts = np.concatenate([[0], newlines + 1])
+        lengths = np.concatenate([newlines, [len(buf)]]) - self.starts
+
+        # look at the first three bytes of every line at once
+        padded = np.concatenate([buf, np.zeros(3, dtype=np.uint8)])
+        c0 = padded[self.starts]
+        c1 = np.where(lengths > 1, padded[self.starts + 1], 0)
+        c2 = np.where(lengths > 2, padded[self.starts + 2], 0)
+        sep1 = (c1 == ord(" ")) | (c1 == ord("\t"))
+        sep2 = (c2 == ord(" ")) | (c2 == ord("\t"))
+
+        self.line_class = np.zeros(len(self.starts), dtype=np.uint8)
+        self.line_class[(c0 == ord("v")) & sep1] = RECORDS["v"][0]
+        self.line_class[(c0 == ord("v")) & (c1 == ord("n")) & sep2] = RECORDS["vn"][0]
+        self.line_class[(c0 == ord("v")) & (c1 == ord("t")) & sep2] = RECORDS["vt"][0]
+        self.line_class[(c0 == ord("f")) & sep1] = RECORDS["f"][0]
+
+        # blank out the prefixes so only the values are left on each line
+        self.buf = padded
+        for cls, prefix_len in RECORDS.values():
+            line_starts = self.starts[self.line_class == cls]
+            for i in range(prefix_len):
+                self.buf[line_starts + i] = ord(" ")
+        self.buf = self.buf[:len(buf)]
+
+        # every byte (including its line break) takes the class of its line
+        self.byte_class = np.repeat(self.line_class, lengths + 1)[:len(buf)]
+
+        # a token starts at a non-space byte that follows a space or a line break
+        is_space = self.buf <= ord(" ")
+        token_start = np.flatnonzero(~is_space & np.concatenate([[True], is_space[:-1]]))
+        token_line = np.searchsorted(self.starts, token_start, side="right") - 1
+        self.tokens = np.bincount(token_line, minlength=len(self.starts))
+
+    def body(self, record):
+        """All lines of one record type, line breaks kept as separators."""
+        return self.buf[self.byte_class == RECORDS[record][0]]
+
+    def token_counts(self, record):
+        """Number of whitespace separated tokens on every line of one record type."""
+        return self.tokens[self.line_class == RECORDS[record][0]]
+
+
+def take_columns(values, counts, width):
+    # first `width` values of every record, whatever the record length is
+    if len(counts) == 0:
+        return np.zeros((0, width), dtype=values.dtype)
+    if np.all(counts == width):
+        return values.reshape(-1, width)
+    if np.any(counts < width):
+        raise ValueError(f"expected at least {width} values per record")
+    offsets = np.cumsum(counts) - counts
+    return values[offsets[:, None] + np.arange(width)]
+
+
+def parse_floats(lines, record, width):
+    body = lines.body(record)
+    counts = lines.token_counts(record)
+    values = np.fromstring(body.tobytes(), dtype=np.float32, sep=" ")
+    if len(values) != counts.sum():
+        raise ValueError(f"malformed '{record}' record")
+    return np.ascontiguousarray(take_columns(values, counts, width))
+
+
+def resolve_indices(raw, count):
+    # obj indices are 1-based, negative ones count back from the end, 0 means missing
+    return np.where(raw > 0, raw - 1, np.where(raw < 0, raw + count, -1))
+
+
+def parse_faces(lines, n_v, n_vt, n_vn):
+    corners = lines.token_counts("f")
+    if len(corners) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    if np.any(corners < 3):
+        raise ValueError("face with less than 3 corners")
+
+    # "1//3" -> "1/0/3", then every "/" becomes a separator
+    body = lines.body("f")
+    slash = body == ord("/")
+    empty_field = np.flatnonzero(slash[:-1] & slash[1:]) + 1
+    body = np.insert(body, empty_field, ord("0"))
+    body[body == ord("/")] = ord(" ")
+    values = np.fromstring(body.tobytes(), dtype=np.int64, sep=" ")
+
+    total = corners.sum()
+    if len(values) % total != 0:
+        raise ValueError("faces mix different v/vt/vn layouts")
+    fields = len(values) // total
+    values = values.reshape(total, fields)
+
+    # fan triangulation (0, i, i + 1) of every face, keeping file order
+    first = np.cumsum(corners) - corners
+    n_tris = corners - 2
+    tri_first = np.repeat(first, n_tris)
+    tri_local = np.arange(n_tris.sum()) - np.repeat(np.cumsum(n_tris) - n_tris, n_tris)
+    tri_corners = np.stack([tri_first, tri_first + tri_local + 1, tri_first + tri_local + 2], axis=1).ravel()
+
+    def column(i, count):
+        if i >= fields:
+            return np.full(len(tri_corners), -1, dtype=np.int64)
+        return resolve_indices(values[tri_corners, i], count)
+
+    return column(0, n_v), column(1, n_vt), column(2, n_vn)
+
+
+def parse_obj(data):
+    """
+    Parses the v / vn / vt / f records of a Wavefront .obj file held in memory.
+    Returns a dict of contiguous arrays: positions, normals, texcoords (float32)
+    and per-corner triangle indices (uint32, faces are fan-triangulated).
+    Missing texcoord / normal indices are -1 in the signed "*_index" arrays.
+    """
+    lines = ObjLines(data)
+    vertices = parse_floats(lines, "v", 3)
+    normals = parse_floats(lines, "vn", 3)
+    texcoords = parse_floats(lines, "vt", 2)
+    v_idx, vt_idx, vn_idx = parse_faces(lines, len(vertices), len(texcoords), len(normals))
+
+    return {
+        "vertices": vertices,
+        "normals": normals,
+        "texcoords": texcoords,
+        "triangles": v_idx.astype(np.uint32),
+        "texcoord_index": vt_idx.astype(np.int32),
+        "normal_index": vn_idx.astype(np.int32),
+    }
+
+
 class LoadMesh(Mesh):
 
-    def __init__(self, filename, draw_type):
-        self.vertices = []
-        self.triangles = []
+    def __init__(self, filename, draw_type, use_buffers=False):
+        self.use_buffers = use_buffers
+        self.vertices = np.zeros((0, 3), dtype=np.float32)
+        self.triangles = np.zeros(0, dtype=np.uint32)
         self.filename = filename
         self.draw_type = draw_type
         self.load_drawing()
 
+    def parse_file(self):
+        with open(self.filename, "rb") as fp:
+            data = fp.read()
+        return parse_obj(data), {}
+
     def load_drawing(self):
-        with open(self.filename) as fp:
-            line = fp.readline()
-            while line:
-                if line[:2] == "v ":
-                    vx, vy, vz = [float(value) for value in line[2:].split()]
-                    # print((vx, vy, vz))
-                    self.vertices.append((vx, vy, vz))
-                if line[:2] == "f ":
-                    t1, t2, t3 = [value for value in line[2:].split()]
-                    self.triangles.append([int(value) for value in t1.split('/')][0] - 1)
-                    self.triangles.append([int(value) for value in t2.split('/')][0] - 1)
-                    self.triangles.append([int(value) for value in t3.split('/')][0] - 1)
-                line = fp.readline()
+        mesh, _ = mesh_cache.load(self.filename, self.parse_file)
+        self.vertices = mesh["vertices"]
+        self.normals = mesh["normals"]
+        self.texcoords = mesh["texcoords"]
+        self.triangles = mesh["triangles"]
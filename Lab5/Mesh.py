@@ -1,20 +1,149 @@
+from contextlib import contextmanager
 from OpenGL.GL import *
+import numpy as np
 import pygame
 
+
+def read_only(value):
+    """(the array, a read-only view of it)"""
+    array = np.asarray(value)
+    view = array.view()
+    view.flags.writeable = False
+    return array, view
+
+
 class Mesh:
 
+    # GPU-resident mode: vertices / triangles live in a VBO / IBO and are drawn with glDrawElements
+    use_buffers = False
+    vbo = None
+    ibo = None
+    ibo_mode = None
+    ibo_count = 0
+    buffers_dirty = True
+
     def __init__(self):
-        self.vertices = [(0.5, -0.5, 0.5),
-                         (-0.5, -0.5, 0.5),
-                         (0.5, 0.5, 0.5),
-                         (-0.5, 0.5, 0.5),
-                         (0.5, 0.5, -0.5),
-                         (-0.5, 0.5, -0.5)]
-
-        self.triangles = [0, 2, 3, 0, 3, 1]
+        self.vertices = np.array([(0.5, -0.5, 0.5),
+                                  (-0.5, -0.5, 0.5),
+                                  (0.5, 0.5, 0.5),
+                                  (-0.5, 0.5, 0.5),
+                                  (0.5, 0.5, -0.5),
+                                  (-0.5, 0.5, -0.5)], dtype=np.float32)
+
+        self.triangles = np.array([0, 2, 3, 0, 3, 1], dtype=np.uint32)
         self.draw_type = GL_LINE_LOOP
 
+    # reassigning the mesh data (or the draw type) schedules a buffer rebuild;
+    # vertices / triangles read back as read-only views, so in-place edits go
+    # through edit() and can never leave the buffers stale
+    @property
+    def vertices(self):
+        return self._vertices_view
+
+    @vertices.setter
+    def vertices(self, value):
+        self._vertices, self._vertices_view = read_only(value)
+        self.buffers_dirty = True
+
+    @property
+    def triangles(self):
+        return self._triangles_view
+
+    @triangles.setter
+    def triangles(self, value):
+        self._triangles, self._triangles_view = read_only(value)
+        self.buffers_dirty = True
+
+    @contextmanager
+    def edit(self):
+        """
+        Writable (vertices, triangles) for in-place edits, rebuilt on the next draw:
+
+            with mesh.edit() as (vertices, triangles):
+                vertices[i] = (x, y, z)
+
+        Arrays that cannot be written (e.g. memory-mapped from the mesh cache)
+        are copied first.
+        """
+        if not self._vertices.flags.writeable:
+            self.vertices = self._vertices.copy()
+        if not self._triangles.flags.writeable:
+            self.triangles = self._triangles.copy()
+        try:
+            yield self._vertices, self._triangles
+        finally:
+            self.buffers_dirty = True
+
+    @property
+    def draw_type(self):
+        return self._draw_type
+
+    @draw_type.setter
+    def draw_type(self, value):
+        self._draw_type = value
+        self.buffers_dirty = True
+
+    def mark_dirty(self):
+        # call after editing an array that was assigned to vertices / triangles
+        # through another reference to it (edit() does this by itself)
+        self.buffers_dirty = True
+
+    def element_indices(self):
+        triangles = np.asarray(self.triangles, dtype=np.uint32).reshape(-1, 3)
+        if self.draw_type == GL_LINE_LOOP:
+            # one loop per triangle == its three edges as GL_LINES
+            edges = triangles[:, [0, 1, 1, 2, 2, 0]]
+            return GL_LINES, np.ascontiguousarray(edges.ravel())
+        if self.draw_type in (GL_TRIANGLES, GL_POLYGON):
+            return GL_TRIANGLES, np.ascontiguousarray(triangles.ravel())
+        return self.draw_type, np.ascontiguousarray(triangles.ravel())
+
+    def upload_buffers(self):
+        vertices = np.ascontiguousarray(self.vertices, dtype=np.float32)
+        self.ibo_mode, indices = self.element_indices()
+        self.ibo_count = len(indices)
+
+        if self.vbo is None:
+            self.vbo = glGenBuffers(1)
+            self.ibo = glGenBuffers(1)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+        self.buffers_dirty = False
+
+    def delete_buffers(self):
+        if self.vbo is not None:
+            glDeleteBuffers(2, [self.vbo, self.ibo])
+        self.vbo = None
+        self.ibo = None
+        self.buffers_dirty = True
+
+    def draw_buffers(self):
+        if self.buffers_dirty:
+            self.upload_buffers()
+
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+
+        glDrawElements(self.ibo_mode, self.ibo_count, GL_UNSIGNED_INT, None)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
     def draw(self):
+        if self.use_buffers:
+            self.draw_buffers()
+            return
+
         for t in range(0, len(self.triangles) , 3):
             glBegin(self.draw_type)
             glVertex3fv(self.vertices[self.triangles[t]])
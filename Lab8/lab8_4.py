@@ -2,8 +2,14 @@ import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
+import numpy as np
 
-def load_obj(filename):
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")) # headless, mesh_cache, textures, ...: one copy for every lab
+import mesh_cache
+
+def parse_obj(filename):
     """
     Parses a simple Wavefront .obj file.
     Supports:
@@ -13,34 +19,44 @@ def load_obj(filename):
     vertices = []
     faces = []
 
+    with open(filename, 'r') as f:
+        for line in f:
+            if line.startswith('#'): continue
+            values = line.split()
+            if not values: continue
+
+            if values[0] == 'v':
+                v = list(map(float, values[1:4]))
+                vertices.append(v)
+
+            elif values[0] == 'f':
+                face_indices = []
+                for v in values[1:]:
+                    w = v.split('/')
+                    face_indices.append(int(w[0]) - 1)
+
+                # fan-triangulate quads (and any larger polygon)
+                for i in range(1, len(face_indices) - 1):
+                    faces.append([face_indices[0], face_indices[i], face_indices[i + 1]])
+
+    arrays = {
+        "vertices": np.array(vertices, dtype=np.float32).reshape(-1, 3),
+        "faces": np.array(faces, dtype=np.uint32).reshape(-1, 3),
+    }
+    return arrays, {}
+
+def load_obj(filename):
+    """
+    Loads an .obj file through the binary mesh cache.
+    Returns (vertices, faces) as (N, 3) float32 and (M, 3) uint32 arrays.
+    """
     try:
-        with open(filename, 'r') as f:
-            for line in f:
-                if line.startswith('#'): continue
-                values = line.split()
-                if not values: continue
-
-                if values[0] == 'v':
-                    v = list(map(float, values[1:4]))
-                    vertices.append(v)
-
-                elif values[0] == 'f':
-                    face_indices = []
-                    for v in values[1:]:
-                        w = v.split('/')
-                        face_indices.append(int(w[0]) - 1)
-                    
-                    if len(face_indices) == 4:
-                        faces.append([face_indices[0], face_indices[1], face_indices[2]])
-                        faces.append([face_indices[0], face_indices[2], face_indices[3]])
-                    else:
-                        faces.append(face_indices)
-                        
+        arrays, _ = mesh_cache.load(filename, lambda: parse_obj(filename))
     except IOError:
         print(f"Error: Could not open {filename}. Make sure it is in the same folder.")
         return [], []
 
-    return vertices, faces
+    return arrays["vertices"], arrays["faces"]
 
 def main():
     pygame.init()
@@ -90,8 +106,8 @@ def main():
 
         glColor3f(0.0, 1.0, 1.0) # Cyan color for the model
         glBegin(GL_TRIANGLES) 
-        for face in faces:
-            shade = 0.5 + (faces.index(face) % 5) * 0.1
+        for face_index, face in enumerate(faces):
+            shade = 0.5 + (face_index % 5) * 0.1
             glColor3f(0.0, shade, shade) 
 
             for vertex_index in face:
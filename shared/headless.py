@@ -0,0 +1,203 @@
+"""
+Headless offscreen rendering for the OpenGL demos.
+
+    python <demo>.py --headless [--frames N] [--size WxH] [--out DIR]
+                     [--platform egl|osmesa] [--orbit DEG]
+
+renders N frames without a window into an offscreen framebuffer, writes
+every frame as a PNG and a frame-time report (frames.csv plus a summary
+on stdout) into DIR. It works with software Mesa (llvmpipe) through EGL
+surfaceless or OSMesa, so it runs on machines without a display.
+
+PyOpenGL picks its platform the first time OpenGL is imported, so this
+module has to be imported BEFORE `from OpenGL.GL import *`: importing it
+reads the command line and, for --headless runs, sets PYOPENGL_PLATFORM.
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+
+
+def parse_args(argv):
+    """Headless options from the command line, or None for a normal windowed run."""
+    if "--headless" not in argv:
+        return None
+    parser = argparse.ArgumentParser(description="Render frames offscreen into PNGs.")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--frames", type=int, default=60, help="number of frames to render")
+    parser.add_argument("--size", type=parse_size, default=None, help="frame size WxH (default: the window size)")
+    parser.add_argument("--out", default="headless_out", help="directory for the PNGs and frames.csv")
+    parser.add_argument("--platform", choices=("egl", "osmesa"),
+                        default=os.environ.get("PYOPENGL_PLATFORM", "egl"),
+                        help="offscreen GL platform (default: EGL surfaceless)")
+    parser.add_argument("--orbit", type=float, default=0.0, help="camera yaw step per frame in degrees (orbit-camera demos)")
+    return parser.parse_args(argv)
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+options = parse_args(sys.argv[1:])
+if options is not None:
+    os.environ["PYOPENGL_PLATFORM"] = options.platform
+    # pygame is still used for fonts and events, but must not open a window
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from OpenGL.GL import *
+
+
+class OffscreenContext:
+    """
+    A current OpenGL context of `width` x `height` with no window.
+
+    EGL: a surfaceless Mesa display; the context renders into a framebuffer
+    object with RGBA and depth renderbuffers.
+    OSMesa: the context renders straight into a buffer in client memory.
+    """
+
+    def __init__(self, width, height, platform):
+        self.width = width
+        self.height = height
+        self.platform = platform
+        self.fbo = None
+        self.renderbuffers = []
+        if platform == "osmesa":
+            self.create_osmesa()
+        else:
+            self.create_egl()
+        glViewport(0, 0, width, height)
+
+    def create_egl(self):
+        import ctypes
+        from OpenGL import EGL
+
+        EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+        self.display = EGL.eglGetPlatformDisplayEXT(EGL_PLATFORM_SURFACELESS_MESA, EGL.EGL_DEFAULT_DISPLAY, None)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not EGL.eglInitialize(self.display, ctypes.pointer(major), ctypes.pointer(minor)):
+            raise RuntimeError("could not initialize an EGL surfaceless display")
+
+        attribs = (EGL.EGLint * 5)(EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+                                   EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_NONE)
+        config, count = EGL.EGLConfig(), EGL.EGLint()
+        if not EGL.eglChooseConfig(self.display, attribs, ctypes.pointer(config), 1, ctypes.pointer(count)) or count.value == 0:
+            raise RuntimeError("no EGL config with desktop OpenGL support")
+
+        # desktop GL (not GLES), so the fixed-function demos run unchanged
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        self.context = EGL.eglCreateContext(self.display, config, EGL.EGL_NO_CONTEXT, None)
+        if not self.context or not EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, self.context):
+            raise RuntimeError("could not create an EGL OpenGL context")
+
+        # surfaceless means no default framebuffer, so render into our own
+        color, depth = glGenRenderbuffers(2)
+        glBindRenderbuffer(GL_RENDERBUFFER, color)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, self.width, self.height)
+        glBindRenderbuffer(GL_RENDERBUFFER, depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH24_STENCIL8, self.width, self.height)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        self.renderbuffers = [color, depth]
+
+        self.fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, color)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_STENCIL_ATTACHMENT, GL_RENDERBUFFER, depth)
+        if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError("offscreen framebuffer is incomplete")
+
+    def create_osmesa(self):
+        from OpenGL import osmesa, arrays
+
+        self.context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+        if not self.context:
+            raise RuntimeError("could not create an OSMesa context")
+        self.buffer = arrays.GLubyteArray.zeros((self.height, self.width, 4))
+        if not osmesa.OSMesaMakeCurrent(self.context, self.buffer, GL_UNSIGNED_BYTE, self.width, self.height):
+            raise RuntimeError("could not make the OSMesa context current")
+
+    def read_pixels(self):
+        """The current frame as a PIL image (top row first)."""
+        from PIL import Image
+
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        data = glReadPixels(0, 0, self.width, self.height, GL_RGB, GL_UNSIGNED_BYTE)
+        image = Image.frombytes("RGB", (self.width, self.height), data)
+        return image.transpose(Image.FLIP_TOP_BOTTOM)
+
+    def close(self):
+        if self.fbo is not None:
+            glBindFramebuffer(GL_FRAMEBUFFER, 0)
+            glDeleteFramebuffers(1, [self.fbo])
+            glDeleteRenderbuffers(len(self.renderbuffers), self.renderbuffers)
+            self.fbo = None
+        if self.platform == "osmesa":
+            from OpenGL import osmesa
+            osmesa.OSMesaDestroyContext(self.context)
+        else:
+            from OpenGL import EGL
+            EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroyContext(self.display, self.context)
+            EGL.eglTerminate(self.display)
+        self.context = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def frame_size(default):
+    return options.size or default
+
+
+def run(size, setup, draw_frame):
+    """
+    Render options.frames frames offscreen and write them as PNGs.
+
+    setup() runs once the context is current (GL state, textures, scene)
+    and returns whatever draw_frame(state, frame) needs; draw_frame draws
+    frame number `frame` the way one iteration of the window loop does,
+    without flipping. The frame time covers draw_frame up to glFinish, so
+    PNG readback and encoding are not counted.
+    """
+    width, height = size
+    os.makedirs(options.out, exist_ok=True)
+
+    with OffscreenContext(width, height, options.platform) as ctx:
+        print(f"Headless: {glGetString(GL_RENDERER).decode()} ({options.platform}), "
+              f"{width}x{height}, {options.frames} frames -> {options.out}")
+        state = setup()
+
+        times = []
+        for frame in range(options.frames):
+            start = time.perf_counter()
+            draw_frame(state, frame)
+            glFinish()
+            times.append(time.perf_counter() - start)
+            ctx.read_pixels().save(os.path.join(options.out, f"frame_{frame:04d}.png"))
+
+    write_report(times)
+    return times
+
+
+def write_report(times):
+    with open(os.path.join(options.out, "frames.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["frame", "ms"])
+        for frame, t in enumerate(times):
+            writer.writerow([frame, f"{t * 1000.0:.3f}"])
+
+    if not times:
+        return
+    ms = sorted(t * 1000.0 for t in times)
+    mean = sum(ms) / len(ms)
+    p95 = ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))]
+    print(f"Frame time (ms): mean {mean:.2f} | median {ms[len(ms) // 2]:.2f} | "
+          f"p95 {p95:.2f} | min {ms[0]:.2f} | max {ms[-1]:.2f} | {1000.0 / mean:.1f} fps")
+    print(f"First frame (includes setup-time driver work): {times[0] * 1000.0:.2f} ms")
@@ -0,0 +1,158 @@
+"""
+Binary sidecar cache for parsed .obj meshes.
+
+The first load of "model.obj" parses the text and writes "model.obj.meshcache"
+next to it. Later loads memory-map the sidecar instead of tokenizing the text
+again, as long as the source files (the .obj and e.g. its .mtl) still match.
+
+File layout (little endian):
+    header   magic, version, number of sources, number of arrays, meta size
+    sources  name, size, mtime (ns) and blake2b digest of every source file
+    arrays   name, dtype, shape, data offset and size of every array
+    meta     small JSON blob (material names, colors, ...)
+    data     raw array bytes, every array 16-byte aligned
+"""
+import os
+import json
+import struct
+import hashlib
+import numpy as np
+
+MAGIC = b"MSHC"
+VERSION = 1
+SUFFIX = ".meshcache"
+ALIGN = 16
+MAX_DIMS = 4
+
+HEADER = struct.Struct("<4sIIII")
+SOURCE = struct.Struct("<64sqq16s")
+ARRAY = struct.Struct(f"<32s8sIQQ{MAX_DIMS}Q")
+
+
+def cache_path(path):
+    return path + SUFFIX
+
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.digest()
+
+
+def aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_cache(path, sources, arrays, meta):
+    """Write `arrays` (name -> ndarray) and `meta` (JSON-able dict) to the sidecar of `path`."""
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+    meta_bytes = json.dumps(meta).encode("utf-8")
+
+    head = bytearray(HEADER.pack(MAGIC, VERSION, len(sources), len(arrays), len(meta_bytes)))
+    for src in sources:
+        st = os.stat(src)
+        name = os.path.basename(src).encode("utf-8")
+        head += SOURCE.pack(name, st.st_size, st.st_mtime_ns, file_digest(src))
+
+    offset = aligned(len(head) + len(arrays) * ARRAY.size + len(meta_bytes))
+    for name, a in arrays.items():
+        if a.ndim > MAX_DIMS:
+            raise ValueError(f"array '{name}' has more than {MAX_DIMS} dimensions")
+        shape = list(a.shape) + [0] * (MAX_DIMS - a.ndim)
+        head += ARRAY.pack(name.encode("ascii"), a.dtype.str.encode("ascii"), a.ndim, offset, a.nbytes, *shape)
+        offset = aligned(offset + a.nbytes)
+    head += meta_bytes
+
+    # write to a temporary file first so a crash never leaves a half-written cache behind
+    tmp = cache_path(path) + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(head)
+        for a in arrays.values():
+            f.write(b"\0" * (aligned(f.tell()) - f.tell()))
+            f.write(a.tobytes())
+    os.replace(tmp, cache_path(path))
+
+
+def read_cache(path, sources):
+    """
+    Memory-map the sidecar of `path` if it is still valid for `sources`.
+    Returns (arrays, meta) or None when there is no usable cache.
+    """
+    cache = cache_path(path)
+    if not os.path.exists(cache) or os.path.getsize(cache) < HEADER.size:
+        return None
+
+    raw = np.memmap(cache, dtype=np.uint8, mode="r")
+    buf = memoryview(raw)
+    magic, version, n_sources, n_arrays, meta_size = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION or n_sources != len(sources):
+        return None
+    pos = HEADER.size
+
+    # size and mtime are checked first, the (slower) content hash only when the mtime moved
+    touched = [] # (record offset, new record) of sources whose mtime moved but content did not
+    for src in sources:
+        name, size, mtime, digest = SOURCE.unpack_from(buf, pos)
+        st = os.stat(src)
+        if name.rstrip(b"\0").decode("utf-8") != os.path.basename(src) or st.st_size != size:
+            return None
+        if st.st_mtime_ns != mtime:
+            if file_digest(src) != digest:
+                return None
+            touched.append((pos, SOURCE.pack(name, size, st.st_mtime_ns, digest)))
+        pos += SOURCE.size
+    if touched:
+        refresh_sources(cache, touched)
+
+    table = []
+    for _ in range(n_arrays):
+        name, dtype, ndim, offset, nbytes, *shape = ARRAY.unpack_from(buf, pos)
+        pos += ARRAY.size
+        table.append((name.rstrip(b"\0").decode("ascii"), np.dtype(dtype.rstrip(b"\0").decode("ascii")),
+                      tuple(shape[:ndim]), offset, nbytes))
+    meta = json.loads(bytes(buf[pos:pos + meta_size]).decode("utf-8"))
+
+    arrays = {}
+    for name, dtype, shape, offset, nbytes in table:
+        arrays[name] = raw[offset:offset + nbytes].view(dtype).reshape(shape)
+    return arrays, meta
+
+
+def refresh_sources(cache, records):
+    """
+    Store the new mtimes of sources that were touched but not changed (e.g. by
+    a checkout), so the next load is back to the size+mtime check instead of
+    hashing them again. Only those fixed-size records are rewritten in place.
+    """
+    try:
+        with open(cache, "r+b") as f:
+            for offset, record in records:
+                f.seek(offset)
+                f.write(record)
+    except OSError:
+        pass # read-only location: the cache stays valid, just hashed each time
+
+
+def load(path, parse, sources=None):
+    """
+    Return (arrays, meta) for the mesh at `path`.
+    `parse()` is only called when the sidecar is missing or stale; its result is cached.
+    `sources` lists every file the parse depends on (defaults to just `path`).
+    """
+    sources = [s for s in (sources or [path]) if os.path.exists(s)]
+    try:
+        cached = read_cache(path, sources)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Warning: ignoring broken mesh cache for {path}: {e}")
+        cached = None
+    if cached is not None:
+        return cached
+
+    arrays, meta = parse()
+    try:
+        write_cache(path, sources, arrays, meta)
+    except OSError as e:
+        print(f"Warning: could not write mesh cache for {path}: {e}")
+    return arrays, meta
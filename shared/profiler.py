@@ -0,0 +1,240 @@
+"""
+Frame-time profiler and HUD for the interactive demo loops.
+
+    profiler = FrameProfiler(gl_timer=True)
+    while running:
+        profiler.begin_frame()
+        with profiler.phase("input"):
+            ...
+        with profiler.phase("draw"):
+            ...
+        with profiler.phase("flip"):
+            pygame.display.flip()
+        clock.tick(FPS)
+
+A frame runs from one begin_frame() to the next, so the time spent in
+clock.tick shows up as "idle". Rolling p50 / p95 / p99 statistics cover the
+last `window` frames; the last `trace` frames (a minute at 60 FPS by default)
+are kept for write_csv / write_json, so memory stays flat however long it runs.
+With gl_timer, the GPU time of the "draw" phase is measured with
+GL_TIME_ELAPSED queries, read back a few frames late so the CPU never waits.
+FrameHud draws the numbers and a frame-time graph in the 2D overlay.
+"""
+import csv
+import ctypes
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+from OpenGL.GL import *
+from text_atlas import TextBatch
+# the wrapped glGetQueryObjectui64v has no output converter for 64-bit values in PyOpenGL
+from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v as get_query_ui64
+
+# phase colors in the HUD graph (RGB); other phases are drawn grey
+PHASE_COLORS = {
+    "input": (0.3, 0.6, 1.0),
+    "simulation": (0.3, 0.9, 0.4),
+    "draw": (1.0, 0.6, 0.2),
+    "flip": (0.9, 0.3, 0.8),
+    "idle": (0.35, 0.35, 0.35),
+}
+GPU_PHASE = "draw"
+GL_QUERY_LAG = 4 # frames between issuing a timer query and reading it
+TRACE_FRAMES = 3600 # frames kept for the CSV / JSON traces
+
+
+class FrameProfiler:
+    def __init__(self, window=300, gl_timer=False, trace=TRACE_FRAMES):
+        self.window = window
+        self.gl_timer = gl_timer
+        self.phases = [] # phase names in first-seen order
+        self.frames = deque(maxlen=trace) # the last `trace` finished frames: {"frame", "total", phase: ms, ..., "gpu"}
+        self.recent = deque(maxlen=window) # the last `window` of those
+        self.frame_count = 0 # frames started so far (the next frame's number)
+        self.current = None
+        self.frame_start = None
+        self.active = None # (phase, start time, GL query) between start() and stop()
+        self.queries = None # GL_TIME_ELAPSED query ring, created on first use
+        self.pending = deque() # (query, frame record) waiting for its result
+
+    def begin_frame(self):
+        """End the previous frame (if any) and start timing a new one."""
+        now = time.perf_counter()
+        if self.current is not None:
+            total = (now - self.frame_start) * 1000.0
+            self.current["total"] = total
+            self.current["idle"] = max(0.0, total - sum(self.current.get(p, 0.0) for p in self.phases))
+            self.frames.append(self.current)
+            self.recent.append(self.current)
+        self.current = {"frame": self.frame_count}
+        self.frame_count += 1
+        self.frame_start = now
+        if self.gl_timer:
+            self.collect_gpu_times()
+
+    @contextmanager
+    def phase(self, name):
+        """Scoped timer: adds the time spent in the with-block to this frame's `name`."""
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def start(self, name):
+        """Unscoped form of phase(), for loops whose phases are not one block each; ends with stop()."""
+        if name not in self.phases:
+            self.phases.append(name)
+        query = self.begin_query() if self.gl_timer and name == GPU_PHASE else None
+        self.active = (name, time.perf_counter(), query)
+
+    def stop(self):
+        name, start, query = self.active
+        self.current[name] = self.current.get(name, 0.0) + (time.perf_counter() - start) * 1000.0
+        if query is not None:
+            glEndQuery(GL_TIME_ELAPSED)
+            self.pending.append((query, self.current))
+        self.active = None
+
+    # --- GL timer queries ---
+
+    def begin_query(self):
+        if self.queries is None:
+            try:
+                self.queries = deque(glGenQueries(GL_QUERY_LAG + 1))
+            except Exception as e:
+                print(f"GL timer queries unavailable ({e}), GPU times are off.")
+                self.gl_timer = False
+                return None
+        if not self.queries:
+            return None # all in flight: skip this frame
+        query = self.queries.popleft()
+        glBeginQuery(GL_TIME_ELAPSED, query)
+        return query
+
+    def collect_gpu_times(self):
+        elapsed = ctypes.c_uint64()
+        while self.pending:
+            query, record = self.pending[0]
+            if not glGetQueryObjectiv(query, GL_QUERY_RESULT_AVAILABLE):
+                break
+            get_query_ui64(query, GL_QUERY_RESULT, ctypes.byref(elapsed))
+            gpu = elapsed.value / 1e6
+            # some drivers (llvmpipe) return garbage for the very first query;
+            # GPU time longer than the whole frame cannot be real, so drop it
+            if gpu <= record.get("total", float("inf")):
+                record["gpu"] = gpu
+            self.pending.popleft()
+            self.queries.append(query)
+
+    # --- Statistics ---
+
+    def percentiles(self, name="total", qs=(50, 95, 99)):
+        """Rolling percentiles (ms) of a phase (or "total" / "idle" / "gpu") over the window."""
+        values = [f[name] for f in self.recent if name in f]
+        if not values:
+            return [0.0] * len(qs)
+        return np.percentile(values, qs).tolist()
+
+    def summary(self):
+        names = ["total"] + self.phases + ["idle"] + (["gpu"] if self.gl_timer else [])
+        return {name: dict(zip(("p50", "p95", "p99"), self.percentiles(name))) for name in names}
+
+    # --- Traces ---
+
+    def columns(self):
+        return ["frame", "total"] + self.phases + ["idle"] + (["gpu"] if self.gl_timer else [])
+
+    def write_csv(self, path):
+        columns = self.columns()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for record in self.frames:
+                writer.writerow([record["frame"]] + [f"{record[c]:.3f}" if c in record else "" for c in columns[1:]])
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump({"columns": self.columns(), "summary": self.summary(), "frames": list(self.frames)}, f)
+
+    def write_traces(self, prefix="profile"):
+        """Write prefix_<time>.csv and .json; returns the base name."""
+        base = f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}"
+        self.write_csv(base + ".csv")
+        self.write_json(base + ".json")
+        return base
+
+
+class FrameHud:
+    """
+    On-screen profiler readout for the 2D overlay (between begin_2d() and
+    end_2d()): percentile lines drawn from a glyph atlas (text_atlas.py),
+    refreshed every `refresh` seconds so the numbers stay readable, and a
+    stacked frame-time graph below them.
+    """
+
+    def __init__(self, profiler, atlas, budget_ms=1000.0 / 60.0, refresh=0.5):
+        self.profiler = profiler
+        self.text = TextBatch(atlas)
+        self.budget_ms = budget_ms
+        self.refresh = refresh
+        self.text_time = None
+        self.text_origin = None
+
+    def text_lines(self):
+        p = self.profiler
+        p50, p95, p99 = p.percentiles()
+        lines = [f"frame {p50:5.1f} / {p95:5.1f} / {p99:5.1f} ms (p50/p95/p99)  {1000.0 / max(p50, 1e-3):5.0f} fps"]
+        for name in p.phases + ["idle"] + (["gpu"] if p.gl_timer else []):
+            p50, p95, p99 = p.percentiles(name)
+            lines.append(f"{name:<10} {p50:5.2f} / {p95:5.2f} / {p99:5.2f} ms")
+        return lines
+
+    def update_text(self, x, y):
+        now = time.perf_counter()
+        if self.text_time is not None and now - self.text_time < self.refresh and self.text_origin == (x, y):
+            return
+        self.text.clear()
+        self.text.add_lines(self.text_lines(), x, y, spacing=2)
+        self.text_time = now
+        self.text_origin = (x, y)
+
+    def draw(self, x, y, graph_w=240, graph_h=80):
+        self.update_text(x, y)
+        self.text.draw()
+        self.draw_graph(x, self.text.bottom + 6, graph_w, graph_h)
+
+    def draw_graph(self, x, y, w, h):
+        """One stacked bar per recent frame (newest on the right), scaled so 2x the budget fills the height."""
+        frames = list(self.profiler.recent)[-w:]
+        scale = h / (2.0 * self.budget_ms)
+
+        glColor4f(0.0, 0.0, 0.0, 0.6)
+        glBegin(GL_QUADS)
+        glVertex2f(x, y); glVertex2f(x + w, y); glVertex2f(x + w, y + h); glVertex2f(x, y + h)
+        glEnd()
+
+        glBegin(GL_QUADS)
+        left = x + w - len(frames)
+        for i, record in enumerate(frames):
+            bottom = y + h
+            for name in self.profiler.phases + ["idle"]:
+                top = max(y, bottom - record.get(name, 0.0) * scale)
+                r, g, b = PHASE_COLORS.get(name, (0.6, 0.6, 0.6))
+                glColor4f(r, g, b, 0.9)
+                glVertex2f(left + i, bottom); glVertex2f(left + i + 1, bottom)
+                glVertex2f(left + i + 1, top); glVertex2f(left + i, top)
+                bottom = top
+        glEnd()
+
+        # frame budget line
+        glColor4f(1.0, 1.0, 1.0, 0.8)
+        glBegin(GL_LINES)
+        glVertex2f(x, y + h - self.budget_ms * scale); glVertex2f(x + w, y + h - self.budget_ms * scale)
+        glEnd()
+        glColor4f(1.0, 1.0, 1.0, 1.0)
+
+    def delete(self):
+        self.text.delete()
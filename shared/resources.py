@@ -0,0 +1,64 @@
+"""
+Shared, reference-counted GL resources (quadrics, meshes); textures have
+their own cache in textures.py.
+
+Everything is looked up by key: the first acquire() creates the resource,
+later ones return the same one and bump its count, and the release() that
+drops the count to zero destroys it. Many objects can therefore share one
+quadric or mesh, and throwing a scene away (release per object) frees
+what nothing else uses, so memory stays flat across reloads.
+"""
+from OpenGL.GL import *
+from OpenGL.GLU import *
+
+
+class ResourcePool:
+    def __init__(self):
+        self.entries = {} # key -> [resource, references, destroy]
+
+    def acquire(self, key, create, destroy, count=1):
+        """
+        The resource for key, created with create() if needed; destroy(resource)
+        frees it. count takes several references at once (one per user).
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [create(), 0, destroy]
+        entry[1] += count
+        return entry[0]
+
+    def release(self, key, count=1):
+        entry = self.entries[key]
+        entry[1] -= count
+        if entry[1] <= 0:
+            del self.entries[key]
+            entry[2](entry[0])
+
+    def references(self, key):
+        entry = self.entries.get(key)
+        return entry[1] if entry else 0
+
+    def clear(self):
+        """Destroy everything, e.g. before the GL context goes away."""
+        for resource, _, destroy in self.entries.values():
+            destroy(resource)
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# one pool per process: the demos use a single GL context
+pool = ResourcePool()
+
+
+def new_quadric(normals):
+    quad = gluNewQuadric()
+    gluQuadricNormals(quad, normals)
+    return quad
+
+def acquire_quadric(normals=GLU_SMOOTH, count=1):
+    return pool.acquire(("quadric", normals), lambda: new_quadric(normals), gluDeleteQuadric, count)
+
+def release_quadric(normals=GLU_SMOOTH, count=1):
+    pool.release(("quadric", normals), count)
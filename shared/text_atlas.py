@@ -0,0 +1,213 @@
+"""
+Overlay text from a glyph atlas.
+
+    atlas = glyph_atlas("Consolas", 16)
+    text = TextBatch(atlas)
+    text.add("Hello", 10, 10)      # text on a translucent box
+    ...
+    begin_2d(); text.draw(); end_2d()
+
+Every printable ASCII glyph of a font is rasterized once into one texture.
+A TextBatch turns strings into textured quads (x, y, u, v, r, g, b, a) into
+a single vertex buffer and draws them all with one call, so text that changes
+every frame (HUD numbers, the light position) costs a vertex upload instead
+of a new surface and texture per string.
+"""
+import ctypes
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+ATLAS_WIDTH = 512
+ATLAS_CHARS = "".join(chr(c) for c in range(32, 127))
+PAD_X, PAD_Y = 5, 3 # text inset in its background box
+VERTEX_FLOATS = 8 # x, y, u, v, r, g, b, a
+
+class GlyphAtlas:
+    """
+    One font's glyphs in one RGBA texture: white glyphs with antialiased
+    alpha (tinted by the vertex color), plus a white block at the origin for
+    solid quads such as text backgrounds. Characters outside the atlas are
+    drawn as '?'.
+    """
+
+    def __init__(self, font, chars=ATLAS_CHARS):
+        self.height = font.get_height()
+        self.lookup = np.full(128, chars.index("?") if "?" in chars else 0, dtype=np.int32) # ASCII code -> glyph
+        self.advance = np.zeros(len(chars), dtype=np.float32)
+        self.uv = np.zeros((len(chars), 4), dtype=np.float32) # u0, v0, u1, v1
+
+        # row-pack the glyphs, 1 px apart so neighbours never bleed in
+        surfaces = [font.render(ch, True, (255, 255, 255)) for ch in chars]
+        places = []
+        x, y = 4, 0 # the white block takes (0, 0)-(2, 2)
+        for i, surf in enumerate(surfaces):
+            w = surf.get_width()
+            if x + w > ATLAS_WIDTH:
+                x, y = 0, y + self.height + 1
+            places.append((x, y))
+            self.advance[i] = w
+            x += w + 1
+        atlas_h = 1
+        while atlas_h < y + self.height:
+            atlas_h *= 2
+
+        image = pygame.Surface((ATLAS_WIDTH, atlas_h), pygame.SRCALPHA)
+        image.fill((255, 255, 255, 0))
+        image.fill((255, 255, 255, 255), pygame.Rect(0, 0, 2, 2))
+        for i, (surf, (x, y)) in enumerate(zip(surfaces, places)):
+            image.blit(surf, (x, y))
+            w = surf.get_width()
+            self.uv[i] = (x / ATLAS_WIDTH, y / atlas_h, (x + w) / ATLAS_WIDTH, (y + self.height) / atlas_h)
+            if ord(chars[i]) < 128:
+                self.lookup[ord(chars[i])] = i
+        self.white_uv = (0.5 / ATLAS_WIDTH, 0.5 / atlas_h)
+
+        # per glyph, its quad's 4 corners (dx, dy, u, v) relative to the pen position
+        u0, v0, u1, v1 = self.uv.T
+        zero = np.zeros(len(chars), dtype=np.float32)
+        self.corners = np.stack([
+            np.stack([zero, zero, u0, v0], axis=1),
+            np.stack([self.advance, zero, u1, v0], axis=1),
+            np.stack([self.advance, zero + self.height, u1, v1], axis=1),
+            np.stack([zero, zero + self.height, u0, v1], axis=1),
+        ], axis=1)
+
+        # rows top first, so v = 0 is the top of the atlas (matches the 2D overlay's top-left origin)
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, ATLAS_WIDTH, atlas_h, 0, GL_RGBA, GL_UNSIGNED_BYTE,
+                     pygame.image.tostring(image, "RGBA", False))
+        # glyph quads are drawn at 1:1 on whole pixels
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def glyphs(self, text):
+        """Atlas indices of the characters of text."""
+        codes = np.frombuffer(text.encode("ascii", "replace"), dtype=np.uint8)
+        return self.lookup[codes]
+
+    def delete(self):
+        if self.texture:
+            glDeleteTextures([self.texture])
+            self.texture = 0
+
+# (font name, size) -> GlyphAtlas; every overlay in the process shares these
+atlases = {}
+
+def glyph_atlas(name, size):
+    """The atlas of pygame.font.SysFont(name, size), rasterized on first use."""
+    atlas = atlases.get((name, size))
+    if atlas is None:
+        pygame.font.init()
+        atlas = atlases[(name, size)] = GlyphAtlas(pygame.font.SysFont(name, size))
+    return atlas
+
+def delete_atlases():
+    """Free every atlas texture, e.g. before the GL context goes away."""
+    for atlas in atlases.values():
+        atlas.delete()
+    atlases.clear()
+
+def rgba(color):
+    """Vertex color (floats) of an RGB or RGBA 0-255 color."""
+    return np.asarray(tuple(color) + (255,) * (4 - len(color)), dtype=np.float32) / 255.0
+
+class TextBatch:
+    """
+    Strings from one atlas, drawn together. add() appends a string (with its
+    background box); draw() uploads the vertices if anything changed and
+    draws every quad in one glDrawArrays. A static overlay is built once;
+    dynamic text is clear()ed and re-added each frame.
+    """
+
+    def __init__(self, atlas):
+        self.atlas = atlas
+        self.blocks = [] # vertex arrays added since the last upload
+        self.vertices = 0 # vertices in the buffer
+        self.dirty = False
+        self.vbo = None
+        self.bottom = 0 # lowest pixel row covered so far
+
+    def clear(self):
+        self.blocks = []
+        self.dirty = True
+        self.bottom = 0
+
+    def add(self, text, x, y, color=(255, 255, 255), bg=(0, 0, 0, 180)):
+        """Queue text with its top-left box corner at (x, y); returns the box (w, h)."""
+        atlas = self.atlas
+        index = atlas.glyphs(text)
+        w = float(atlas.advance[index].sum()) + 2 * PAD_X
+        h = atlas.height + 2 * PAD_Y
+
+        if bg is not None and bg[3] > 0:
+            wu, wv = atlas.white_uv
+            box = np.array([[x, y, wu, wv], [x + w, y, wu, wv], [x + w, y + h, wu, wv], [x, y + h, wu, wv]], dtype=np.float32)
+            self.blocks.append(np.hstack([box, np.tile(rgba(bg), (4, 1))]))
+
+        # glyph quads: the atlas corners moved to each glyph's pen position
+        advance = atlas.advance[index]
+        block = np.empty((len(index), 4, VERTEX_FLOATS), dtype=np.float32)
+        block[:, :, :4] = atlas.corners[index]
+        block[:, :, 0] += (x + PAD_X + np.cumsum(advance) - advance)[:, None]
+        block[:, :, 1] += y + PAD_Y
+        block[:, :, 4:] = rgba(color)
+        self.blocks.append(block.reshape(-1, VERTEX_FLOATS))
+
+        self.dirty = True
+        self.bottom = max(self.bottom, y + h)
+        return w, h
+
+    def add_lines(self, lines, x, y, spacing=6, **style):
+        """Stack lines of text downwards from (x, y); returns the y below the last box."""
+        for line in lines:
+            _, h = self.add(line, x, y, **style)
+            y += h + spacing
+        return y
+
+    def upload(self):
+        data = np.concatenate(self.blocks) if self.blocks else np.zeros((0, VERTEX_FLOATS), dtype=np.float32)
+        if self.vbo is None:
+            self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        # a fresh store each time, so the driver never waits on last frame's draw
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data if len(data) else None, GL_STREAM_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.vertices = len(data)
+        self.dirty = False
+
+    def draw(self):
+        """Draw everything added; call between begin_2d() and end_2d()."""
+        if self.dirty:
+            self.upload()
+        if not self.vertices:
+            return
+        stride = VERTEX_FLOATS * 4
+        glDisable(GL_CULL_FACE)
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.atlas.texture)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(2, GL_FLOAT, stride, ctypes.c_void_p(0))
+        glTexCoordPointer(2, GL_FLOAT, stride, ctypes.c_void_p(8))
+        glColorPointer(4, GL_FLOAT, stride, ctypes.c_void_p(16))
+        glDrawArrays(GL_QUADS, 0, self.vertices)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glDisable(GL_TEXTURE_2D)
+        glColor4f(1.0, 1.0, 1.0, 1.0)
+
+    def delete(self):
+        """Free the vertex buffer (the atlas is shared and stays)."""
+        if self.vbo is not None:
+            glDeleteBuffers(1, [self.vbo])
+            self.vbo = None
+        self.blocks = []
+        self.vertices = 0
@@ -0,0 +1,145 @@
+"""
+Shared texture manager.
+
+    tex = load_texture("floor.jpg")                 # decoded and uploaded once
+    tex = load_texture("floor.jpg")                 # same texture id, no decode
+    release_texture(tex)                            # stays resident until evicted
+
+Textures are keyed by the image's content hash (plus the load options), so a
+file loaded twice, or two files with the same bytes, share one GL texture.
+Each path remembers its hash for as long as its size and modification time
+stay the same, so a repeated load does not even read the file again.
+
+Released textures are not deleted right away: they stay resident, least
+recently used first in line for eviction, as long as all textures together
+fit in the VRAM budget. Textures still in use are never evicted.
+"""
+import os
+import io
+import hashlib
+from collections import OrderedDict
+from OpenGL.GL import *
+
+# Pillow (PIL) for decoding images
+try:
+    from PIL import Image
+except ImportError:
+    raise SystemExit("Missing Pillow. Install with: python -m pip install Pillow")
+
+TEXTURE_BUDGET_MB = 256 # default VRAM budget for resident textures
+
+class TextureCache:
+    def __init__(self, budget_mb=TEXTURE_BUDGET_MB):
+        self.budget = budget_mb * 1024 * 1024 # bytes
+        self.entries = OrderedDict() # (hash, options) -> [tex, bytes, references]; least recently used first
+        self.keys = {} # tex -> its entries key
+        self.hashes = {} # path -> (size, mtime, content hash)
+        self.resident = 0 # bytes of all textures in self.entries
+
+    def load(self, path, use_alpha=False, mipmaps=False):
+        """
+        Texture id of an image file, with GL_REPEAT wrapping; use_alpha forces
+        RGBA (images with transparency get it anyway), mipmaps adds a
+        trilinear mip chain. Every load() takes a reference; release() it.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Texture not found: {path}")
+
+        data = None
+        stat = os.stat(path)
+        known = self.hashes.get(path)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            digest = known[2]
+        else:
+            with open(path, 'rb') as f:
+                data = f.read()
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            self.hashes[path] = (stat.st_size, stat.st_mtime_ns, digest)
+
+        key = (digest, use_alpha, mipmaps)
+        entry = self.entries.get(key)
+        if entry is None:
+            if data is None: # hash was known, but the texture has been evicted since
+                with open(path, 'rb') as f:
+                    data = f.read()
+            tex, size = upload_image(Image.open(io.BytesIO(data)), use_alpha, mipmaps)
+            entry = self.entries[key] = [tex, size, 0]
+            self.keys[tex] = key
+            self.resident += size
+        self.entries.move_to_end(key)
+        entry[2] += 1
+        self.evict()
+        return entry[0]
+
+    def release(self, tex):
+        """Drop one reference; the texture stays resident until evicted."""
+        key = self.keys.get(tex)
+        if key is None:
+            return
+        entry = self.entries[key]
+        entry[2] = max(0, entry[2] - 1)
+        self.evict()
+
+    def evict(self):
+        """Delete unused textures, least recently used first, until the rest fit the budget."""
+        if self.resident <= self.budget:
+            return
+        for key, (tex, size, references) in list(self.entries.items()):
+            if self.resident <= self.budget:
+                break
+            if references == 0:
+                glDeleteTextures([tex])
+                del self.entries[key]
+                del self.keys[tex]
+                self.resident -= size
+
+    def set_budget(self, budget_mb):
+        self.budget = budget_mb * 1024 * 1024
+        self.evict()
+
+    def clear(self):
+        """Delete every texture, e.g. before the GL context goes away."""
+        for tex, _, _ in self.entries.values():
+            glDeleteTextures([tex])
+        self.entries.clear()
+        self.keys.clear()
+        self.resident = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+def upload_image(img, use_alpha, mipmaps):
+    """Upload a PIL image as a GL_REPEAT texture; returns (tex, estimated bytes in VRAM)."""
+    if use_alpha or img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert("RGBA")
+        mode = GL_RGBA
+    else:
+        img = img.convert("RGB")
+        mode = GL_RGB
+    img = img.transpose(Image.FLIP_TOP_BOTTOM)
+
+    tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, tex)
+    glTexImage2D(GL_TEXTURE_2D, 0, mode, img.width, img.height, 0, mode, GL_UNSIGNED_BYTE, img.tobytes())
+    if mipmaps:
+        glGenerateMipmap(GL_TEXTURE_2D)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+    else:
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
+    glBindTexture(GL_TEXTURE_2D, 0)
+
+    # drivers store RGB as RGBA; a full mip chain adds a third
+    size = img.width * img.height * 4
+    return tex, size * 4 // 3 if mipmaps else size
+
+# one cache per process: the demos use a single GL context
+cache = TextureCache()
+
+def load_texture(path, use_alpha=False, mipmaps=False):
+    return cache.load(path, use_alpha, mipmaps)
+
+def release_texture(tex):
+    cache.release(tex)